@@ -0,0 +1,11 @@
+# backend/apps.py
+from django.apps import AppConfig
+
+
+class BackendConfig(AppConfig):
+    """Project-level hooks that don't belong to any one app"""
+    name = 'backend'
+
+    def ready(self):
+        # Tune SQLite connections (WAL, busy_timeout, ...)
+        from . import db  # noqa: F401
@@ -0,0 +1,17 @@
+# backend/db.py
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created, dispatch_uid='configure_sqlite')
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply ``settings.SQLITE_PRAGMAS`` to each new SQLite connection.
+
+    WAL lets readers run alongside the single writer, synchronous=NORMAL is
+    safe under WAL and busy_timeout makes writers queue instead of erroring.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
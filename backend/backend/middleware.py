@@ -0,0 +1,143 @@
+# backend/middleware.py
+import gzip
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(r'^(text/|application/(json|javascript|xml)|image/svg\+xml)')
+
+
+def accepted_encodings(header):
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    encodings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        encodings[coding.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(header):
+    """Pick br or gzip for an Accept-Encoding header, or None"""
+    encodings = accepted_encodings(header or '')
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    wildcard = encodings.get('*', 0)
+    scored = [(encodings.get(coding, wildcard), coding) for coding in candidates]
+    # Ties go to the first candidate, i.e. brotli when installed
+    quality, coding = max(scored, key=lambda item: item[0])
+    return coding if quality > 0 else None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress buffered text and JSON responses with brotli or gzip.
+
+    Responses under ``COMPRESSION_MIN_SIZE`` bytes are sent as-is, since
+    compressing them costs more than it saves. Streaming responses (exports,
+    PDF reports, the event stream) are never buffered here.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', ''))
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif encoding == 'gzip':
+            compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The body bytes differ per encoding, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+async def _aread_file(file, block_size=64 * 1024):
+    """Read a file in a worker thread, one block at a time"""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(block_size):
+            yield chunk
+    finally:
+        await sync_to_async(file.close, thread_sensitive=False)()
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise is sync-only, which turns every middleware and view below it
+    sync too: under uvicorn each request then holds a thread from the first
+    middleware to the last byte. Here the static file lookup is a dict read,
+    file blocks are read in a worker thread, and everything else goes
+    straight on to the async handler.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Scans the static directories, so keep it off the event loop
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+
+        response = await sync_to_async(static_file.get_response, thread_sensitive=False)(
+            request.method, request.META
+        )
+        if response.file is None:
+            # HEAD, 304 and error responses carry no body
+            http_response = HttpResponse(status=int(response.status))
+        else:
+            http_response = StreamingHttpResponse(_aread_file(response.file), status=int(response.status))
+        del http_response['Content-Type']
+        for key, value in response.headers:
+            http_response[key] = value
+        return http_response
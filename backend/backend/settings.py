@@ -41,6 +41,10 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')  # Gmail App Password from .env file
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
 
+# Emails are written to the outbox table and sent by `manage.py deliver_outbox`.
+# Set EMAIL_OUTBOX_EAGER=True to send them in-process after commit instead.
+EMAIL_OUTBOX_EAGER = os.getenv('EMAIL_OUTBOX_EAGER', 'False').lower() == 'true'
+
 # Frontend URL for email links
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
 
@@ -57,6 +61,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'backend',
     'task',
     'staff',
 ]
@@ -70,13 +75,24 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # API_JSON_RENDERER=drf switches back to the stock json-module renderer
+        {
+            'orjson': 'backend.renderers.ORJSONRenderer',
+            'drf': 'rest_framework.renderers.JSONRenderer',
+        }[os.getenv('API_JSON_RENDERER', 'orjson')],
     ],
 }
 
+# Response compression (backend.middleware.CompressionMiddleware): brotli when
+# installed and accepted, else gzip, for bodies of at least this many bytes
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Added for static file serving
+    'backend.middleware.CompressionMiddleware',  # Above anything that rewrites the body
+    'backend.middleware.AsyncWhiteNoiseMiddleware',  # Static files; async-capable, unlike WhiteNoise's own
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
     'django.middleware.common.CommonMiddleware',
@@ -160,10 +176,60 @@ import os
 data_dir = os.path.join(BASE_DIR, 'data')
 os.makedirs(data_dir, exist_ok=True)
 
-DATABASES = {
+# DB_ENGINE picks the profile: 'sqlite' (default) or 'postgres'
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE == 'postgres':
+    # Needs psycopg (and psycopg[pool] when DB_POOL is on)
+    DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'tasks'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Django's pool and persistent connections are mutually exclusive
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', os.path.join(data_dir, 'db.sqlite3')),
+            'OPTIONS': {
+                # Take the write lock at BEGIN so read-then-write transactions
+                # wait on busy_timeout instead of failing with "database is locked"
+                'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            },
+        }
+    }
+
+# Applied to every new SQLite connection by backend.db.configure_sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+}
+
+# Cache
+# Shared by every gunicorn worker so cached dashboard counters stay consistent.
+# The file backend needs no SQL on a hit; point CACHE_BACKEND/CACHE_LOCATION at
+# django.core.cache.backends.redis.RedisCache to share it across hosts.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(data_dir, 'db.sqlite3'),
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(data_dir, 'cache')),
     }
 }
 
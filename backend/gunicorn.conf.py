@@ -0,0 +1,52 @@
+# gunicorn.conf.py
+"""
+Gunicorn runtime profile, tuned from the environment.
+
+Gunicorn picks this file up automatically when started from backend/, or pass
+it explicitly with ``gunicorn -c gunicorn.conf.py``.
+"""
+import multiprocessing
+import os
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() == 'true'
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Threaded workers keep serving while one thread waits on a slow PDF export,
+# SMTP or the database. Set uvicorn.workers.UvicornWorker to serve the ASGI
+# application instead, so the /api/async/ views wait without holding a thread.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+wsgi_app = os.getenv(
+    'GUNICORN_APP',
+    'backend.asgi:application' if 'uvicorn' in worker_class.lower() else 'backend.wsgi_docker:application'
+)
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Import Django once in the master so workers share its pages copy-on-write
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Recycle workers periodically; the jitter stops them restarting all at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Worker heartbeats on tmpfs so a slow disk never looks like a hung worker
+worker_tmp_dir = os.getenv('GUNICORN_WORKER_TMP_DIR', '/dev/shm' if os.path.isdir('/dev/shm') else None)
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Never share a database connection opened by the preloading master"""
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
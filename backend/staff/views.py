@@ -9,6 +9,7 @@ from django.views.decorators.csrf import csrf_exempt
 from .models import User
 from .serializers import UserSerializer, UserCreateSerializer, LoginSerializer
 from task.permissions import IsAdmin
+from task.conditional import conditional_view, user_list_etag
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -48,6 +49,7 @@ def user_info_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_view(user_list_etag)
 def get_all_users(request):
     """Get all users - All authenticated users can see user list for task assignment"""
     users = User.objects.all().order_by('role', 'department')
@@ -1,6 +1,6 @@
 # task/admin.py
 from django.contrib import admin
-from .models import Task, TaskAssignment, TaskHistory, TaskAttachment
+from .models import Task, TaskAssignment, TaskHistory, TaskComment, TaskAttachment
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -40,6 +40,14 @@ class TaskHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ['task', 'action', 'performed_by', 'timestamp', 'details']
 
 
+@admin.register(TaskComment)
+class TaskCommentAdmin(admin.ModelAdmin):
+    list_display = ['task', 'author', 'timestamp']
+    search_fields = ['task__title', 'author__email', 'comment']
+    date_hierarchy = 'timestamp'
+    readonly_fields = ['task', 'history', 'author', 'timestamp']
+
+
 @admin.register(TaskAttachment)
 class TaskAttachmentAdmin(admin.ModelAdmin):
     list_display = ['task', 'file_name', 'uploaded_by', 'uploaded_at', 'file_size']
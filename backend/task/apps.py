@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class TaskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task'
+
+    def ready(self):
+        # Connect cache invalidation and other model signal handlers
+        from . import signals  # noqa: F401
+
+        # The SQLite full-text index is not a model, so it is created after
+        # every migrate once the tasks table exists
+        post_migrate.connect(create_search_index, sender=self)
+
+
+def create_search_index(using='default', **kwargs):
+    """Create the FTS5 task search table and triggers after migrate"""
+    from django.db import connections
+    from .search import ensure_search_index
+    ensure_search_index(connections[using])
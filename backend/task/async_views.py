@@ -0,0 +1,217 @@
+# task/async_views.py
+"""
+Async read endpoints served under /api/async/.
+
+They mirror the sync DRF views of the same name but are plain Django async
+views, so under an ASGI server (uvicorn workers) a request waiting on the
+database or cache does not hold a worker thread.
+"""
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from staff.models import User
+from staff.serializers import UserSerializer
+from .counters import aget_dashboard_counts
+from .events import aoldest_event_id, avisible_events, broadcaster, format_event, stream_token_user_id
+from .filters import filter_tasks
+from .models import Task, TaskComment, TaskHistory
+from .pagination import apaginate_keyset, get_page_size
+from .serializers import TaskSerializer, TaskDetailSerializer, TaskHistorySerializer
+
+logger = logging.getLogger(__name__)
+
+jwt_authentication = JWTAuthentication()
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+async def authenticate_jwt(request):
+    """The user of the request's bearer token; returns a 401 response on failure"""
+    try:
+        # Token validation is CPU-only; the user lookup runs in a thread
+        auth = await sync_to_async(jwt_authentication.authenticate)(request)
+    except AuthenticationFailed as e:
+        # Same body as DRF's exception handler
+        detail = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+        return json_response(detail, status=401)
+    if auth is None:
+        return json_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+    return auth[0]
+
+
+async def authenticate_stream_token(request):
+    """The user of a ``?token=`` stream token, else of the bearer token.
+
+    EventSource cannot send headers, so browsers fetch a short-lived stream
+    token from /api/tasks/events/token/ and pass it in the URL instead.
+    """
+    token = request.GET.get('token')
+    if token is None:
+        return await authenticate_jwt(request)
+    try:
+        user_id = stream_token_user_id(token)
+        return await User.objects.aget(pk=user_id, is_active=True)
+    except (signing.BadSignature, User.DoesNotExist):
+        return json_response({'detail': 'Stream token is invalid or expired.'}, status=401)
+
+
+def async_api_view(view=None, authenticate=authenticate_jwt):
+    """Restrict an async view to authenticated GET requests, like the DRF views"""
+    if view is None:
+        return lambda view: async_api_view(view, authenticate)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        user = await authenticate(request)
+        if isinstance(user, JsonResponse):
+            return user
+        request.user = user
+        try:
+            return await view(request, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in {view.__name__}: {str(e)}")
+            return json_response({'error': 'Internal server error', 'detail': str(e)}, status=500)
+    return wrapper
+
+
+@async_api_view
+async def dashboard_view(request):
+    """Dashboard stats for all roles"""
+    counts = await aget_dashboard_counts(request.user)
+    return json_response({
+        'total_task': counts['total_task'],
+        'completed_task': counts['completed_task'],
+        'ongoing_task': counts['ongoing_task']
+    })
+
+
+@async_api_view
+async def get_all_tasks(request):
+    """Get all tasks based on user role, optionally one keyset page at a time"""
+    try:
+        tasks = filter_tasks(Task.objects.visible_to(request.user), request.GET).for_list()
+    except ValueError as e:
+        return json_response({'error': 'Invalid filter', 'detail': str(e)}, status=400)
+
+    if 'cursor' in request.GET or 'page_size' in request.GET:
+        try:
+            page, next_cursor = await apaginate_keyset(
+                tasks,
+                cursor=request.GET.get('cursor'),
+                page_size=get_page_size(request.GET.get('page_size'))
+            )
+        except ValueError as e:
+            return json_response({'error': 'Invalid pagination', 'detail': str(e)}, status=400)
+        return json_response({'tasks': TaskSerializer(page, many=True).data, 'next_cursor': next_cursor})
+
+    tasks = [task async for task in tasks.aiterator(chunk_size=2000)]
+    return json_response({'tasks': TaskSerializer(tasks, many=True).data})
+
+
+@async_api_view
+async def get_task(request, task_id):
+    """Get a task"""
+    user = request.user
+    try:
+        task = await Task.objects.for_detail().aget(id=task_id)
+    except Task.DoesNotExist:
+        return json_response({'error': 'Task not found'}, status=404)
+
+    # Assignments are prefetched, so the visibility check needs no query
+    if not task.is_visible_to(user):
+        return json_response({'error': 'Permission denied'}, status=403)
+
+    return json_response(TaskDetailSerializer(task).data)
+
+
+@async_api_view
+async def get_task_history(request):
+    """Get recent task history/activity based on user role, including follow-up comments"""
+    user = request.user
+    history = TaskHistory.objects.visible_to(user).select_related('task', 'performed_by')
+    comments = TaskComment.objects.visible_to(user).select_related(
+        'author', 'history'
+    ).order_by('-timestamp')[:20]
+
+    activities = [entry async for entry in history[:10].aiterator()]
+    follow_comments = [
+        {
+            'id': entry.id,
+            'task_id': entry.task_id,
+            'comment': entry.comment,
+            'performed_by': entry.author.email if entry.author else 'System',
+            'timestamp': entry.timestamp,
+            'full_details': entry.history.details if entry.history else {},
+        }
+        async for entry in comments.aiterator()
+    ]
+    return json_response({
+        'activities': TaskHistorySerializer(activities, many=True).data,
+        'follow_comments': follow_comments
+    })
+
+
+@async_api_view
+async def get_all_users(request):
+    """Get all users - All authenticated users can see user list for task assignment"""
+    users = [user async for user in User.objects.order_by('role', 'department').aiterator()]
+    return json_response({'users': UserSerializer(users, many=True).data})
+
+
+@async_api_view(authenticate=authenticate_stream_token)
+async def task_events(request):
+    """Server-sent events stream of task changes the user may see.
+
+    Authenticates with a ``?token=`` stream token or a bearer token. Resumes
+    after the ``Last-Event-ID`` header (or ``?last_event_id=``) and sends a
+    comment line as heartbeat. A ``reset`` event asks the client to
+    reload, when the events it missed were already pruned.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI every open stream would hold a worker thread
+        return json_response({'error': 'Event stream is only served by the ASGI application'}, status=501)
+
+    user = request.user
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            return json_response({'error': 'Invalid Last-Event-ID', 'detail': last_event_id}, status=400)
+
+    async def stream():
+        yield 'retry: 3000\n\n'
+        if last_event_id is not None:
+            oldest = await aoldest_event_id()
+            if oldest is not None and last_event_id < oldest - 1:
+                yield 'event: reset\ndata: {}\n\n'
+        async for events in broadcaster.listen(last_event_id):
+            if not events:
+                yield ': heartbeat\n\n'
+                continue
+            for event in await avisible_events(user, events):
+                yield format_event(event)
+
+    # Sync middleware pins a thread to each request for its whole lifetime;
+    # release the database connection the token check opened on it, since
+    # the stream itself reads events through the shared broadcaster
+    await sync_to_async(connections.close_all)()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx and similar proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
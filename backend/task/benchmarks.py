@@ -0,0 +1,581 @@
+# task/benchmarks.py
+import http.client
+import os
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from staff.models import User
+from .models import Task, TaskAssignment, TaskHistory
+
+SEED_BATCH_SIZE = 5000
+WRITE_THREADS = 8
+LOAD_CONCURRENCY = 16
+BENCH_PORT = 8765
+# Link speed assumed when turning response sizes into transfer times
+RENDER_LINK_MBPS = 20
+
+
+@contextmanager
+def throwaway_database():
+    """Run a benchmark against a fresh, file-backed test database"""
+    tmpdir = tempfile.mkdtemp(prefix='task-bench-')
+    if connection.vendor == 'sqlite':
+        # A file keeps the data set out of the measured process memory
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def seed_users():
+    """Create one HOD and a handful of faculty per benchmark department"""
+    users = []
+    for department in ['CSE', 'ECE', 'MECH', 'IT']:
+        User.objects.create_user(f'hod.{department.lower()}@bench.local', None, role='hod', department=department)
+        for i in range(5):
+            users.append(User.objects.create_user(
+                f'faculty{i}.{department.lower()}@bench.local', None, role='faculty', department=department
+            ))
+    User.objects.create_user('staff@bench.local', None, role='staff', department='OFFICE')
+    return users
+
+
+def seed_tasks(count, users, start=0):
+    """Bulk-insert tasks ``start`` .. ``count`` with two assignments each"""
+    now = timezone.now()
+    statuses = ['pending', 'ongoing', 'completed', 'overdue']
+    priorities = ['urgent', 'high', 'medium', 'low']
+    for batch_start in range(start, count, SEED_BATCH_SIZE):
+        batch_end = min(batch_start + SEED_BATCH_SIZE, count)
+        tasks = Task.objects.bulk_create([
+            Task(
+                title=f'Benchmark task {i}',
+                description=f'Prepare the semester report number {i} for the department review',
+                priority=priorities[i % 4],
+                status=statuses[i % 4],
+                due_date=now + timedelta(hours=i % 500 - 100),
+                created_by='Benchmark'
+            )
+            for i in range(batch_start, batch_end)
+        ])
+        TaskAssignment.objects.bulk_create([
+            TaskAssignment(task=task, assignee=assignee, department=assignee.department)
+            for i, task in enumerate(tasks, start=batch_start)
+            for assignee in (users[i % len(users)], users[(i + 7) % len(users)])
+        ])
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """Current resident set size in MB (falls back to the peak off Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+@contextmanager
+def measure():
+    """Collect wall time and peak traced Python heap for the enclosed block"""
+    result = {}
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - started
+        result['heap_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+
+def bench_pdf(sizes, report):
+    """Peak memory of the streaming PDF report as the task table grows"""
+    from .reports import iter_task_report_pdf
+
+    users = seed_users()
+    seeded = 0
+    report(f"{'tasks':>8} {'seconds':>8} {'bytes':>12} {'heap peak MB':>13} {'RSS growth MB':>15}")
+    for size in sizes:
+        seed_tasks(size, users, start=seeded)
+        seeded = size
+        baseline = current_rss_mb()
+        rss_growth = written = 0
+        with measure() as result:
+            for chunk in iter_task_report_pdf(Task.objects.all()):
+                written += len(chunk)
+                rss_growth = max(rss_growth, current_rss_mb() - baseline)
+        report(
+            f"{size:>8} {result['seconds']:>8.2f} {written:>12} "
+            f"{result['heap_peak_mb']:>13.2f} {rss_growth:>15.2f}"
+        )
+
+
+@contextmanager
+def sqlite_profile(pragmas, transaction_mode):
+    """Open new SQLite connections with the given pragmas and transaction mode"""
+    options = connections['default'].settings_dict['OPTIONS']
+    old_mode = options.get('transaction_mode')
+    connections.close_all()
+    options['transaction_mode'] = transaction_mode
+    try:
+        with override_settings(SQLITE_PRAGMAS=pragmas):
+            yield
+    finally:
+        connections.close_all()
+        options['transaction_mode'] = old_mode
+
+
+def database_profiles():
+    """(name, context manager factory) for each profile this backend can compare"""
+    if connection.vendor != 'sqlite':
+        return [(connection.vendor, nullcontext)]
+    return [
+        # Django's defaults: rollback journal, FULL sync, deferred transactions
+        ('sqlite-default', lambda: sqlite_profile({'journal_mode': 'DELETE'}, None)),
+        ('sqlite-tuned', lambda: sqlite_profile(settings.SQLITE_PRAGMAS, 'IMMEDIATE')),
+    ]
+
+
+def edit_tasks(task_ids, writes, performed_by, latencies, errors):
+    """Read-modify-write tasks the way a PUT does, recording latency and lock errors"""
+    priorities = ['urgent', 'high', 'medium', 'low']
+    try:
+        for i in range(writes):
+            started = time.perf_counter()
+            try:
+                with transaction.atomic():
+                    task = Task.objects.get(id=random.choice(task_ids))
+                    task.priority = priorities[i % 4]
+                    task.save(notify=False)
+                    TaskHistory.objects.create(
+                        task=task,
+                        action='updated',
+                        performed_by=performed_by,
+                        details={'updated_fields': ['priority'], 'source': 'benchmark'}
+                    )
+            except OperationalError:
+                errors.append(1)
+            else:
+                latencies.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+def bench_db_writes(sizes, report):
+    """Throughput and lock errors of concurrent task edits under each database profile"""
+    users = seed_users()
+    seed_tasks(500, users)
+    task_ids = list(Task.objects.values_list('id', flat=True))
+    report(
+        f"{'profile':>15} {'writes':>8} {'seconds':>8} {'writes/s':>9} "
+        f"{'p95 ms':>8} {'errors':>7}"
+    )
+    for name, profile in database_profiles():
+        with profile():
+            for size in sizes:
+                latencies, errors = [], []
+                threads = [
+                    threading.Thread(
+                        target=edit_tasks,
+                        args=(task_ids, size // WRITE_THREADS, users[n], latencies, errors)
+                    )
+                    for n in range(WRITE_THREADS)
+                ]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                seconds = time.perf_counter() - started
+                latencies.sort()
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+                report(
+                    f"{name:>15} {len(latencies):>8} {seconds:>8.2f} "
+                    f"{len(latencies) / seconds:>9.0f} {p95:>8.1f} {len(errors):>7}"
+                )
+
+
+def server_environment():
+    """Environment pointing a server subprocess at the throwaway database"""
+    env = dict(os.environ, DEBUG='False', ALLOWED_HOSTS='127.0.0.1')
+    if connection.vendor == 'sqlite':
+        env['SQLITE_PATH'] = connection.settings_dict['NAME']
+    else:
+        env['DB_NAME'] = connection.settings_dict['NAME']
+    return env
+
+
+@contextmanager
+def gunicorn_server(args, env, port=BENCH_PORT):
+    """Run gunicorn with ``args`` until the block exits; yields the process"""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *args, '--bind', f'127.0.0.1:{port}'],
+        cwd=settings.BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def fetch_paths(port, paths, headers, latencies, errors):
+    """Request each path over one keep-alive connection"""
+    client = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        for path in paths:
+            started = time.perf_counter()
+            try:
+                client.request('GET', path, headers=headers)
+                response = client.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+                    continue
+            except (OSError, http.client.HTTPException):
+                errors.append(0)
+                client.close()
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        client.close()
+
+
+def run_load(port, paths, headers, concurrency=LOAD_CONCURRENCY):
+    """Spread ``paths`` over concurrent clients; returns (latencies, errors, seconds)"""
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=fetch_paths, args=(port, paths[n::concurrency], headers, latencies, errors))
+        for n in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors, time.perf_counter() - started
+
+
+def bench_http(sizes, report):
+    """Requests per second of the old single sync worker against gunicorn.conf.py"""
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    users = seed_users()
+    seed_tasks(2000, users)
+    admin = User.objects.create_user('admin@bench.local', None, role='admin', department='OFFICE')
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+    # Mostly page reads, with a slow PDF report every 100 requests
+    mix = ['/api/tasks/?page_size=50'] * 79 + ['/api/dashboard/'] * 20 + ['/api/tasks/generate-pdf/']
+
+    env = server_environment()
+    profiles = [
+        # What the Dockerfile used to run: one sync worker
+        ('single-sync', dict(env, GUNICORN_WORKERS='1', GUNICORN_WORKER_CLASS='sync', GUNICORN_THREADS='1')),
+        ('gunicorn.conf', env),
+    ]
+    report(
+        f"{'profile':>14} {'requests':>9} {'seconds':>8} {'req/s':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'errors':>7}"
+    )
+    for name, profile_env in profiles:
+        with gunicorn_server(['-c', 'gunicorn.conf.py', 'backend.wsgi_docker'], profile_env):
+            for size in sizes:
+                paths = (mix * (size // len(mix) + 1))[:size]
+                latencies, errors, seconds = run_load(BENCH_PORT, paths, headers)
+                p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+                report(
+                    f"{name:>14} {len(latencies):>9} {seconds:>8.2f} {len(latencies) / seconds:>7.0f} "
+                    f"{p50:>8.1f} {p95:>8.1f} {len(errors):>7}"
+                )
+
+
+def process_tree_pids(pid):
+    """A process and its direct children (Linux only; empty when unavailable)"""
+    pids = [pid]
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as children:
+                pids.extend(int(child) for child in children.read().split())
+    except OSError:
+        return []
+    return pids
+
+
+def process_tree_threads(pid):
+    """Number of threads in a process and its direct children (Linux only)"""
+    total = 0
+    for child in process_tree_pids(pid):
+        try:
+            total += len(os.listdir(f'/proc/{child}/task'))
+        except OSError:
+            pass
+    return total
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and its direct children, in MB (Linux only)"""
+    total = 0
+    for child in process_tree_pids(pid):
+        try:
+            with open(f'/proc/{child}/statm') as statm:
+                total += int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+    return total / (1024 * 1024)
+
+
+def bench_async(sizes, report):
+    """Sync gthread workers against async views on uvicorn workers, at equal worker count.
+
+    ``sizes`` are the numbers of concurrent clients; memory and threads are
+    counted over the whole gunicorn process tree after the load.
+    """
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    users = seed_users()
+    seed_tasks(2000, users)
+    admin = User.objects.create_user('admin@bench.local', None, role='admin', department='OFFICE')
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(admin)}'}
+    mix = ['tasks/?page_size=50', 'dashboard/', 'tasks/history/', 'tasks/1/', 'tasks/?page_size=20']
+
+    env = dict(server_environment(), GUNICORN_WORKERS='2')
+    profiles = [
+        ('gthread', '/api/', dict(env, GUNICORN_WORKER_CLASS='gthread')),
+        ('uvicorn', '/api/async/', dict(env, GUNICORN_WORKER_CLASS='uvicorn.workers.UvicornWorker')),
+    ]
+    report(
+        f"{'profile':>8} {'clients':>8} {'requests':>9} {'req/s':>7} "
+        f"{'p95 ms':>8} {'errors':>7} {'RSS MB':>8} {'threads':>8}"
+    )
+    for name, prefix, profile_env in profiles:
+        with gunicorn_server(['-c', 'gunicorn.conf.py'], profile_env) as server:
+            for clients in sizes:
+                count = max(clients * 10, 200)
+                paths = [prefix + mix[i % len(mix)] for i in range(count)]
+                latencies, errors, seconds = run_load(BENCH_PORT, paths, headers, concurrency=clients)
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+                report(
+                    f"{name:>8} {clients:>8} {len(latencies):>9} {len(latencies) / seconds:>7.0f} "
+                    f"{p95:>8.1f} {len(errors):>7} {process_tree_rss_mb(server.pid):>8.1f} "
+                    f"{process_tree_threads(server.pid):>8}"
+                )
+
+
+def bench_search(sizes, report, repeat=20):
+    """FTS5 search against the icontains fallback as the task table grows"""
+    from .search import parse_terms, search_tasks_fts, search_tasks_icontains
+
+    users = seed_users()
+    admin = User.objects.create_user('admin@bench.local', None, role='admin', department='OFFICE')
+    hod = User.objects.get(email='hod.cse@bench.local')
+    # A rare term, a two-word phrase and a word in every description
+    queries = ['4242', 'report 777', 'semester']
+    seeded = 0
+    report(f"{'tasks':>8} {'user':>6} {'query':>12} {'fts ms':>8} {'icontains ms':>13} {'hits':>5}")
+    for size in sizes:
+        # The triggers index rows as they are inserted
+        seed_tasks(size, users, start=seeded)
+        seeded = size
+        for user in (admin, hod):
+            for query in queries:
+                terms = parse_terms(query)
+                timings = {}
+                for name, search in (('fts', search_tasks_fts), ('icontains', search_tasks_icontains)):
+                    started = time.perf_counter()
+                    for _ in range(repeat):
+                        hits = search(user, terms)
+                    timings[name] = (time.perf_counter() - started) / repeat * 1000
+                report(
+                    f"{size:>8} {user.role:>6} {query:>12} {timings['fts']:>8.2f} "
+                    f"{timings['icontains']:>13.2f} {len(hits):>5}"
+                )
+
+
+def percentiles(samples):
+    """p50 and p99 of a list of durations, in milliseconds"""
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1000, samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000
+
+
+def bench_render(sizes, report, repeat=30):
+    """JSON rendering and response compression for unpaginated task lists.
+
+    Each renderer and encoding runs ``repeat`` times; transfer time is the
+    body size over a RENDER_LINK_MBPS link, so it shows what compression
+    saves a client on a typical connection.
+    """
+    import gzip
+
+    from rest_framework.renderers import JSONRenderer
+    from backend.middleware import brotli
+    from backend.renderers import ORJSONRenderer
+    from .serializers import TaskSerializer
+
+    def timed(func):
+        durations = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            durations.append(time.perf_counter() - started)
+        return result, percentiles(durations)
+
+    encoders = [('identity', lambda body: body)]
+    encoders.append(('gzip', lambda body: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)))
+    if brotli is not None:
+        encoders.append(('br', lambda body: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)))
+
+    users = seed_users()
+    seeded = 0
+    report(
+        f"{'tasks':>8} {'step':>14} {'p50 ms':>8} {'p99 ms':>8} {'bytes':>11} {'transfer ms':>12}"
+    )
+    for size in sizes:
+        seed_tasks(size, users, start=seeded)
+        seeded = size
+        data = TaskSerializer(Task.objects.for_list()[:size], many=True).data
+        for name, renderer in (('drf', JSONRenderer()), ('orjson', ORJSONRenderer())):
+            body, (p50, p99) = timed(lambda: renderer.render(data))
+            report(f"{size:>8} {'render ' + name:>14} {p50:>8.1f} {p99:>8.1f} {len(body):>11}")
+        for name, encode in encoders:
+            compressed, (p50, p99) = timed(lambda: encode(body))
+            transfer = len(compressed) * 8 / (RENDER_LINK_MBPS * 1000)
+            report(
+                f"{size:>8} {'encode ' + name:>14} {p50:>8.1f} {p99:>8.1f} "
+                f"{len(compressed):>11} {transfer:>12.1f}"
+            )
+
+
+async def open_event_streams(port, count, token, batch=500):
+    """Open ``count`` SSE connections; returns the readers and the number that failed"""
+    import asyncio
+
+    async def connect():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(
+            f'GET /api/async/events/?token={token} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+            f'Accept: text/event-stream\r\n\r\n'.encode()
+        )
+        await reader.readuntil(b'retry: 3000\n\n')
+        return reader, writer
+
+    streams, failed = [], 0
+    # Connect in batches so the listen backlog never overflows
+    for start in range(0, count, batch):
+        results = await asyncio.gather(
+            *(connect() for _ in range(min(batch, count - start))), return_exceptions=True
+        )
+        streams.extend(r for r in results if not isinstance(r, BaseException))
+        failed += sum(isinstance(r, BaseException) for r in results)
+    return streams, failed
+
+
+def bench_sse(sizes, report):
+    """Idle SSE connections one uvicorn worker process holds, and event fan-out time.
+
+    ``sizes`` are the numbers of connections. Memory is the resident size of
+    the gunicorn process tree; fan-out is the time from a task insert until
+    every stream has received its event.
+    """
+    import asyncio
+    from .events import make_stream_token
+
+    # Each connection is a file descriptor on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    admin = User.objects.create_user('admin@bench.local', None, role='admin', department='OFFICE')
+    token = make_stream_token(admin)
+    env = dict(
+        server_environment(),
+        GUNICORN_WORKERS='1',
+        GUNICORN_WORKER_CLASS='uvicorn.workers.UvicornWorker',
+        # Worker recycling would drop every open stream
+        GUNICORN_MAX_REQUESTS='0',
+    )
+
+    def create_task():
+        Task.objects.create(
+            title='Fan-out', description='Benchmark', due_date=timezone.now(), created_by='Benchmark'
+        )
+        connection.close()
+
+    async def measure(port, count):
+        streams, failed = await open_event_streams(port, count, token)
+        await asyncio.sleep(1)
+        rss = process_tree_rss_mb(server.pid)
+        started = time.perf_counter()
+        await asyncio.to_thread(create_task)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(reader.readuntil(b'event: created\n'), 30) for reader, _ in streams),
+            return_exceptions=True
+        )
+        fan_out = time.perf_counter() - started
+        missed = sum(isinstance(r, BaseException) for r in results)
+        for _, writer in streams:
+            writer.close()
+        return len(streams), failed, rss, fan_out, missed
+
+    report(
+        f"{'streams':>8} {'open':>7} {'failed':>7} {'RSS MB':>8} {'KB/stream':>10} "
+        f"{'fan-out ms':>11} {'missed':>7}"
+    )
+    try:
+        with gunicorn_server(['-c', 'gunicorn.conf.py'], env) as server:
+            base = process_tree_rss_mb(server.pid)
+            for count in sizes:
+                opened, failed, rss, fan_out, missed = asyncio.run(measure(BENCH_PORT, count))
+                per_stream = (rss - base) * 1024 / opened if opened else 0
+                report(
+                    f"{count:>8} {opened:>7} {failed:>7} {rss:>8.1f} {per_stream:>10.1f} "
+                    f"{fan_out * 1000:>11.0f} {missed:>7}"
+                )
+                time.sleep(2)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+SCENARIOS = {
+    'pdf': bench_pdf,
+    'db-writes': bench_db_writes,
+    'http': bench_http,
+    'async': bench_async,
+    'search': bench_search,
+    'sse': bench_sse,
+    'render': bench_render,
+}
@@ -0,0 +1,259 @@
+# task/bulk.py
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from staff.models import User
+from .counters import invalidate_all_counters, invalidate_scopes
+from .events import record_events
+from .filters import filter_tasks, parse_datetime_param
+from .models import Task, TaskAssignment, TaskHistory
+from .outbox import enqueue_emails
+
+# Largest batch accepted by the bulk endpoints
+MAX_BULK_ITEMS = 1000
+
+# Fields a bulk update may change
+BULK_UPDATE_FIELDS = ('status', 'priority', 'due_date')
+
+
+def resolve_users_by_email(emails):
+    """Map each known email to its User with a single ``email__in`` query"""
+    return {user.email: user for user in User.objects.filter(email__in=set(emails))}
+
+
+def invalidate_assignment_counters(assignments):
+    """Refresh the dashboard counters of new assignments.
+
+    bulk_create skips the post_save handler that normally does this, so
+    every caller that bulk-creates assignments calls this instead.
+    """
+    invalidate_scopes(
+        departments=[a.department for a in assignments],
+        assignee_ids=[a.assignee_id for a in assignments]
+    )
+
+
+def sync_task_assignees(task, emails):
+    """Make the assignees of ``task`` match ``emails`` with minimal writes.
+
+    Only removed assignments are deleted and only new ones inserted; kept
+    assignments retain their ids, ``assigned_at`` and ``completed_at``.
+    Unknown emails are skipped. Returns ``(added, removed, unknown)`` email lists.
+    """
+    wanted = list(dict.fromkeys(emails))
+    current = {a.assignee.email: a for a in task.assignments.select_related('assignee')}
+
+    removed = [email for email in current if email not in wanted]
+    missing = [email for email in wanted if email not in current]
+    users = resolve_users_by_email(missing) if missing else {}
+    added = [email for email in missing if email in users]
+    unknown = [email for email in missing if email not in users]
+
+    if removed:
+        TaskAssignment.objects.filter(id__in=[current[email].id for email in removed]).delete()
+    if added:
+        assignments = TaskAssignment.objects.bulk_create([
+            TaskAssignment(
+                task=task,
+                assignee=users[email],
+                department=users[email].department or 'GENERAL'  # Fallback to GENERAL
+            )
+            for email in added
+        ])
+        invalidate_assignment_counters(assignments)
+    return added, removed, unknown
+
+
+def bulk_create_tasks(items, performed_by):
+    """Validate and create many tasks in one transaction with set-based inserts.
+
+    Items that fail validation, or name unknown assignees, are reported in the
+    returned error list and skipped; the rest are created together. Returns
+    ``(tasks, errors)`` where each error is ``{'index': i, 'errors': {...}}``.
+    """
+    from .serializers import TaskCreateSerializer
+    from .utils import build_task_assignment_emails
+
+    errors = []
+    valid = []
+    for index, item in enumerate(items):
+        serializer = TaskCreateSerializer(data=item)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+        elif serializer.validated_data.get('attachment'):
+            errors.append({'index': index, 'errors': {'attachment': ['Attachments are not supported in bulk creation']}})
+        else:
+            valid.append((index, serializer.validated_data))
+
+    users = resolve_users_by_email(
+        email for _, data in valid for email in data['assignee']
+    )
+
+    ready = []
+    for index, data in valid:
+        unknown = [email for email in data['assignee'] if email not in users]
+        if unknown:
+            errors.append({'index': index, 'errors': {'assignee': [f"Unknown user '{email}'" for email in unknown]}})
+        else:
+            ready.append(data)
+    # Unknown-assignee errors are found after validation errors; report in input order
+    errors.sort(key=lambda error: error['index'])
+
+    if not ready:
+        return [], errors
+
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create([
+            Task(**{
+                field: value for field, value in data.items()
+                if field not in ('assignee', 'department', 'attachment')
+            })
+            for data in ready
+        ])
+
+        assignments = []
+        for task, data in zip(tasks, ready):
+            # unique_together allows one assignment per task-assignee pair
+            for email in dict.fromkeys(data['assignee']):
+                assignee = users[email]
+                assignments.append(TaskAssignment(
+                    task=task,
+                    assignee=assignee,
+                    department=assignee.department or 'GENERAL'  # Fallback to GENERAL
+                ))
+        TaskAssignment.objects.bulk_create(assignments)
+
+        TaskHistory.objects.bulk_create([
+            TaskHistory(
+                task=task,
+                action='created',
+                performed_by=performed_by,
+                details={'departments': data['department'], 'assignees': data['assignee']}
+            )
+            for task, data in zip(tasks, ready)
+        ])
+
+        enqueue_emails(build_task_assignment_emails([(a.task, a.assignee) for a in assignments]))
+
+        # bulk_create skips the signal handlers
+        invalidate_all_counters()
+        for status_value in {task.status for task in tasks}:
+            record_events('created', [task.id for task in tasks if task.status == status_value], status=status_value)
+
+    return tasks, errors
+
+
+def parse_bulk_changes(data):
+    """Validate the ``changes`` of a bulk update. Raises ValueError on bad input"""
+    if not isinstance(data, dict) or not data:
+        raise ValueError('changes must be a non-empty object')
+    unknown = set(data) - set(BULK_UPDATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unsupported field(s): {', '.join(sorted(unknown))}")
+
+    changes = {}
+    if 'status' in data:
+        if data['status'] not in dict(Task.STATUS_CHOICES):
+            raise ValueError(f"Invalid status '{data['status']}'")
+        changes['status'] = data['status']
+    if 'priority' in data:
+        if data['priority'] not in dict(Task.PRIORITY_CHOICES):
+            raise ValueError(f"Invalid priority '{data['priority']}'")
+        changes['priority'] = data['priority']
+    if 'due_date' in data:
+        changes['due_date'] = parse_datetime_param('due_date', str(data['due_date']))
+    return changes
+
+
+def _history_value(value):
+    return str(value) if value is not None else None
+
+
+def bulk_update_tasks(queryset, changes, performed_by, now=None):
+    """Apply one set of ``changes`` to every task in ``queryset``.
+
+    Tasks that already hold the new values are left alone. The rest are
+    changed with a single UPDATE, get their history rows in one insert and
+    each recipient is sent one digest email covering all of their tasks.
+    Returns the ids of the updated tasks. Raises ValueError when ``queryset``
+    selects more than MAX_BULK_ITEMS tasks.
+    """
+    from .utils import build_update_digest_emails
+
+    now = now or timezone.now()
+    fields = list(changes)
+
+    with transaction.atomic():
+        # One row past the cap is enough to tell an oversized filter apart
+        tasks = list(queryset.select_for_update().only('id', 'title', *fields).order_by('id')[:MAX_BULK_ITEMS + 1])
+        if len(tasks) > MAX_BULK_ITEMS:
+            raise ValueError(f'The selection matches more than {MAX_BULK_ITEMS} tasks; narrow the filter')
+        task_changes = {}
+        for task in tasks:
+            diff = {
+                field: {'old': getattr(task, field), 'new': value}
+                for field, value in changes.items()
+                if getattr(task, field) != value
+            }
+            if diff:
+                task_changes[task.id] = (task, diff)
+        if not task_changes:
+            return []
+
+        updates = dict(changes, updated_at=now)
+        if 'status' in changes:
+            # Same completed_at rules as update_task, folded into the UPDATE
+            updates['completed_at'] = (
+                Coalesce(F('completed_at'), Value(now)) if changes['status'] == 'completed' else None
+            )
+        Task.objects.filter(id__in=task_changes).update(**updates)
+
+        TaskHistory.objects.bulk_create([
+            TaskHistory(
+                task=task,
+                action='updated',
+                performed_by=performed_by,
+                timestamp=now,
+                details={
+                    'changes': {
+                        field: {'old': _history_value(change['old']), 'new': _history_value(change['new'])}
+                        for field, change in diff.items()
+                    },
+                    'updated_fields': list(diff),
+                    'source': 'bulk_update',
+                }
+            )
+            for task, diff in task_changes.values()
+        ])
+
+        assignments = TaskAssignment.objects.filter(task_id__in=task_changes).select_related('assignee')
+        enqueue_emails(build_update_digest_emails(
+            (task_changes[a.task_id][0], a.assignee, task_changes[a.task_id][1])
+            for a in assignments
+        ))
+
+        if 'status' in changes:
+            invalidate_all_counters()
+        record_events('updated', list(task_changes), status=changes.get('status'), now=now)
+
+    return list(task_changes)
+
+
+def select_tasks(data):
+    """Queryset for a bulk selection given as ``ids`` or ``filter``. Raises ValueError"""
+    if 'ids' in data:
+        ids = data['ids']
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            raise ValueError('ids must be a non-empty list of task ids')
+        if len(ids) > MAX_BULK_ITEMS:
+            raise ValueError(f'At most {MAX_BULK_ITEMS} ids can be updated at once')
+        return Task.objects.filter(id__in=ids)
+    if isinstance(data.get('filter'), dict) and data['filter']:
+        params = {
+            key: ','.join(map(str, value)) if isinstance(value, list) else str(value)
+            for key, value in data['filter'].items()
+        }
+        return filter_tasks(Task.objects.all(), params)
+    raise ValueError('Provide either ids or a non-empty filter')
@@ -0,0 +1,112 @@
+# task/changes.py
+"""
+Delta sync: what changed in a user's task list since a watermark token.
+
+Changed tasks are found through the ``updated_at`` index. Their assignments
+travel inside the task payload, because every assignment change also saves
+the task. New follow-up comments come from ``task_comments``. Deletions come
+from the tombstones written when a task is deleted, or when an unassignment
+takes a task out of a user's or department's view.
+"""
+import base64
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Task, TaskComment, TaskTombstone
+
+# Rows are stamped before their transaction commits, so each poll re-reads a
+# short window behind the watermark; clients upsert, so repeats are harmless
+CHANGES_OVERLAP = timedelta(seconds=5)
+
+# Tombstones older than this are pruned; older tokens must reload everything
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+def encode_token(watermark):
+    """Opaque token for a watermark datetime"""
+    return base64.urlsafe_b64encode(watermark.isoformat().encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Turn a token back into its watermark datetime"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        watermark = parse_datetime(base64.urlsafe_b64decode(padded).decode())
+    except (TypeError, ValueError, UnicodeDecodeError):
+        watermark = None
+    if watermark is None:
+        raise ValueError(f"Invalid token '{token}'")
+    return watermark
+
+
+def record_tombstones(task_ids, now=None):
+    """Log deleted task ids"""
+    now = now or timezone.now()
+    TaskTombstone.objects.bulk_create([TaskTombstone(task_id=task_id, deleted_at=now) for task_id in task_ids])
+
+
+def record_revocations(assignments, now=None):
+    """Log removed assignments, so the assignee and their department's HOD drop the task"""
+    now = now or timezone.now()
+    TaskTombstone.objects.bulk_create([
+        TaskTombstone(task_id=a.task_id, user_id=a.assignee_id, department=a.department, deleted_at=now)
+        for a in assignments
+    ])
+
+
+def prune_tombstones(now=None):
+    """Delete tombstones past the retention window; returns how many were removed.
+
+    Tokens that old already get a reset, so nothing reads these rows any more.
+    Runs from the overdue sweep and the reminder scheduler, outside the
+    transactions that delete tasks.
+    """
+    now = now or timezone.now()
+    deleted, _ = TaskTombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+    return deleted
+
+
+def collect_changes(user, token=None, now=None):
+    """Return the changes visible to ``user`` since ``token``.
+
+    The result has ``tasks`` (a queryset ready for TaskSerializer),
+    ``comments`` (a TaskComment queryset), ``deleted`` task ids, the ``next``
+    token and ``reset``. Without a token, or with one older than the
+    tombstone retention, nothing is listed and ``reset`` tells the client
+    to reload the full list first.
+    """
+    now = now or timezone.now()
+    result = {
+        'tasks': Task.objects.none(),
+        'comments': TaskComment.objects.none(),
+        'deleted': [],
+        'next': encode_token(now),
+        'reset': True,
+    }
+    if not token:
+        return result
+    watermark = decode_token(token)
+    if watermark < now - TOMBSTONE_RETENTION:
+        return result
+
+    since = watermark - CHANGES_OVERLAP
+    result['tasks'] = Task.objects.visible_to(user).filter(updated_at__gt=since).order_by('updated_at', 'id')
+    result['comments'] = TaskComment.objects.visible_to(user).filter(timestamp__gt=since).order_by('timestamp', 'id')
+    # Deleted tasks go to everyone: the tasks are gone, so the ids reveal
+    # nothing, and clients ignore ids they never had. Revocations go to the
+    # assignee and HOD they name, unless the task is visible again (another
+    # assignment in the department, or a reassignment)
+    tombstones = Q(user__isnull=True, department__isnull=True) | Q(user=user)
+    if user.role == 'hod':
+        tombstones |= Q(department=user.department)
+    deleted = (
+        TaskTombstone.objects.filter(tombstones, deleted_at__gt=since)
+        .exclude(Exists(Task.objects.visible_to(user).filter(pk=OuterRef('task_id'))))
+        .values_list('task_id', flat=True)
+    )
+    result['deleted'] = list(dict.fromkeys(deleted))
+    result['reset'] = False
+    return result
@@ -0,0 +1,75 @@
+# task/conditional.py
+"""
+Conditional GET support for the endpoints the frontend re-fetches on every
+navigation.
+
+Each validator is computed without serializing anything: the task list uses
+one aggregate over the user's visible tasks, the dashboard and user list use
+version tokens that writers already replace in the cache. A matching
+``If-None-Match`` is answered with 304 before the view runs.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .counters import dashboard_version
+from .filters import filter_tasks
+from .models import Task
+from .recipients import directory_version
+
+
+def make_etag(*parts):
+    """Quoted strong ETag from the parts that determine a representation"""
+    digest = hashlib.blake2b('|'.join(str(part) for part in parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def conditional_view(etag_func):
+    """Like Django's ``condition``, but also make clients revalidate every time.
+
+    Apply it below ``@api_view`` so the validator sees the authenticated user.
+    """
+    def decorator(view):
+        conditional = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            # Responses are per user: revalidate, never store in shared caches
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
+
+
+def task_list_etag(request):
+    """Row count and newest ``updated_at`` of the tasks the request would list.
+
+    Every task write, bulk update and overdue sweep moves ``updated_at``,
+    and deletions change the count. The user directory version covers
+    renamed assignees.
+    """
+    try:
+        tasks = filter_tasks(Task.objects.visible_to(request.user), request.GET)
+    except ValueError:
+        # Let the view answer with its 400
+        return None
+    state = tasks.order_by().aggregate(count=Count('id'), latest=Max('updated_at'))
+    return make_etag(
+        'tasks', request.user.pk, request.get_full_path(),
+        state['count'], state['latest'], directory_version()
+    )
+
+
+def dashboard_etag(request):
+    """The counter version of the user's scope; no database query"""
+    return make_etag('dashboard', dashboard_version(request.user))
+
+
+def user_list_etag(request):
+    """The user directory version; no database query"""
+    return make_etag('users', directory_version())
@@ -0,0 +1,159 @@
+# task/counters.py
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import Task, TaskAssignment
+
+# Upper bound on how long counters may be served without a recount
+COUNTER_TIMEOUT = 60 * 60
+
+GENERATION_KEY = 'dashboard:generation'
+
+# Comment totals are informational, so a briefly stale count is acceptable
+COMMENT_COUNT_TIMEOUT = 60
+
+
+def scope_for_user(user):
+    """Return the counter scope a user's dashboard is computed over"""
+    if user.role == 'admin' or user.is_superuser:
+        return 'global'
+    if user.role == 'hod':
+        return f'department:{user.department}'
+    if user.role == 'faculty':
+        return f'assignee:{user.id}'
+    # Staff see every task
+    return 'global'
+
+
+def queryset_for_scope(scope):
+    """Return the tasks counted for a scope"""
+    kind, _, value = scope.partition(':')
+    if kind == 'department':
+        return Task.objects.filter(Exists(
+            TaskAssignment.objects.filter(task=OuterRef('pk'), department=value)
+        ))
+    if kind == 'assignee':
+        return Task.objects.filter(Exists(
+            TaskAssignment.objects.filter(task=OuterRef('pk'), assignee_id=value)
+        ))
+    return Task.objects.all()
+
+
+def _counter_aggregates():
+    return {
+        'total_task': Count('id'),
+        'completed_task': Count('id', filter=Q(status='completed')),
+        'ongoing_task': Count('id', filter=Q(status='pending')),  # pending = ongoing
+    }
+
+
+def count_tasks(queryset):
+    """Compute every dashboard counter in one conditional-aggregate query"""
+    return queryset.order_by().aggregate(**_counter_aggregates())
+
+
+def _version_key(scope):
+    return f'dashboard:version:{scope}'
+
+
+def get_dashboard_counts(user):
+    """Return the dashboard counters for a user, served from cache when fresh.
+
+    Cached counts are keyed by a global generation and a per-scope version.
+    Writers replace those tokens after commit, so a recount that raced with a
+    write is stored under a key nobody reads again.
+    """
+    scope = scope_for_user(user)
+    counts_key = f'dashboard:counts:{dashboard_version(user)}'
+    counts = cache.get(counts_key)
+    if counts is None:
+        counts = count_tasks(queryset_for_scope(scope))
+        cache.set(counts_key, counts, COUNTER_TIMEOUT)
+    return counts
+
+
+def dashboard_version(user):
+    """Token naming the current counters of a user's scope, read from cache only"""
+    scope = scope_for_user(user)
+    version_key = _version_key(scope)
+    tokens = cache.get_many([GENERATION_KEY, version_key])
+    generation = tokens.get(GENERATION_KEY) or _reset(GENERATION_KEY)
+    version = tokens.get(version_key) or _reset(version_key)
+    return f'{generation}:{scope}:{version}'
+
+
+async def aget_dashboard_counts(user):
+    """Async variant of get_dashboard_counts using the async cache and ORM APIs"""
+    scope = scope_for_user(user)
+    version_key = _version_key(scope)
+    tokens = await cache.aget_many([GENERATION_KEY, version_key])
+    generation = tokens.get(GENERATION_KEY) or await _areset(GENERATION_KEY)
+    version = tokens.get(version_key) or await _areset(version_key)
+
+    counts_key = f'dashboard:counts:{generation}:{scope}:{version}'
+    counts = await cache.aget(counts_key)
+    if counts is None:
+        counts = await acount_tasks(queryset_for_scope(scope))
+        await cache.aset(counts_key, counts, COUNTER_TIMEOUT)
+    return counts
+
+
+def get_comment_count(user, queryset):
+    """Return the total of a user's follow-up comment feed, cached for a short while"""
+    scope = 'global' if user.role == 'admin' or user.is_superuser else f'assignee:{user.id}'
+    return cache.get_or_set(
+        f'comments:count:{scope}',
+        lambda: queryset.order_by().count(),
+        COMMENT_COUNT_TIMEOUT
+    )
+
+
+async def acount_tasks(queryset):
+    """Async variant of count_tasks"""
+    return await queryset.order_by().aaggregate(**_counter_aggregates())
+
+
+def _reset(key):
+    token = uuid.uuid4().hex
+    if not cache.add(key, token, None):
+        # Another worker initialised it first
+        token = cache.get(key) or token
+    return token
+
+
+async def _areset(key):
+    token = uuid.uuid4().hex
+    if not await cache.aadd(key, token, None):
+        token = await cache.aget(key) or token
+    return token
+
+
+def invalidate_scopes(departments=(), assignee_ids=(), include_global=True):
+    """Invalidate the counters of the given scopes once the transaction commits"""
+    scopes = [f'department:{d}' for d in set(departments)]
+    scopes += [f'assignee:{a}' for a in set(assignee_ids)]
+    if include_global:
+        scopes.append('global')
+
+    def replace_versions():
+        cache.set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+
+    transaction.on_commit(replace_versions)
+
+
+def invalidate_task_counters(task, include_global=True):
+    """Invalidate every scope a task is counted in"""
+    assignments = list(task.assignments.values_list('department', 'assignee_id'))
+    invalidate_scopes(
+        departments=[d for d, _ in assignments],
+        assignee_ids=[a for _, a in assignments],
+        include_global=include_global
+    )
+
+
+def invalidate_all_counters():
+    """Invalidate every scope at once, for bulk writes that bypass signals"""
+    transaction.on_commit(lambda: cache.set(GENERATION_KEY, uuid.uuid4().hex, None))
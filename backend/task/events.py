@@ -0,0 +1,216 @@
+# task/events.py
+"""
+Task change events for the server-sent events stream.
+
+Writers append rows to ``task_events`` inside their transaction. Every
+worker process runs one EventBroadcaster that polls the table for new rows
+and wakes the streams connected to that process. Changes made on any worker
+therefore reach every stream, and idle streams cost no queries.
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import timedelta
+
+from django.core import signing
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Task, TaskAssignment, TaskEvent, sees_all_tasks
+
+logger = logging.getLogger(__name__)
+
+# How often each process checks task_events for new rows
+POLL_INTERVAL = 1.0
+
+# A comment line is sent after this many quiet seconds, so proxies keep the
+# connection open and clients notice a dead one
+HEARTBEAT_INTERVAL = 15
+
+# Recent events kept in memory for streams that fall slightly behind
+BUFFER_SIZE = 1000
+
+# Rows read per query when polling or replaying a resumed stream
+BATCH_SIZE = 500
+
+# Events older than this are pruned; clients resuming from further back reload
+EVENT_RETENTION = timedelta(days=1)
+
+# Longest wait between poll retries while the database keeps failing
+MAX_POLL_BACKOFF = 30
+
+# Stream tokens travel in the URL, which proxies and servers log, so they
+# only open event streams and expire quickly
+STREAM_TOKEN_MAX_AGE = timedelta(minutes=5)
+STREAM_TOKEN_SALT = 'task.events.stream'
+
+
+def record_events(kind, task_ids, status=None, now=None):
+    """Append one event per task id"""
+    now = now or timezone.now()
+    TaskEvent.objects.bulk_create([
+        TaskEvent(kind=kind, task_id=task_id, status=status, created_at=now)
+        for task_id in task_ids
+    ])
+
+
+def prune_events(now=None):
+    """Delete events past the retention window; returns how many were removed.
+
+    Runs from the overdue sweep and the reminder scheduler rather than from
+    writers, so task saves never hold the write lock for the cleanup.
+    """
+    now = now or timezone.now()
+    deleted, _ = TaskEvent.objects.filter(created_at__lt=now - EVENT_RETENTION).delete()
+    return deleted
+
+
+async def aoldest_event_id():
+    """Id of the oldest event still stored, or None"""
+    return (await TaskEvent.objects.aaggregate(oldest=Min('id')))['oldest']
+
+
+async def avisible_events(user, events):
+    """The events ``user`` may see, following the task and comment visibility rules.
+
+    Deletions carry only an id and go to everyone. Comments go to admins and
+    the task's assignees, and never to HODs. Task events go to users who can
+    see the task.
+    """
+    is_admin = user.role == 'admin' or user.is_superuser
+    if is_admin:
+        return events
+
+    task_ids = set()
+    if not sees_all_tasks(user):
+        task_ids.update(e.task_id for e in events if e.kind in ('created', 'updated'))
+    comment_ids = set()
+    if user.role != 'hod':
+        comment_ids.update(e.task_id for e in events if e.kind == 'comment')
+
+    visible = set()
+    if task_ids:
+        visible = {
+            task_id async for task_id in
+            Task.objects.visible_to(user).filter(id__in=task_ids).values_list('id', flat=True)
+        }
+    assigned = set()
+    if comment_ids:
+        assigned = {
+            task_id async for task_id in
+            TaskAssignment.objects.filter(task_id__in=comment_ids, assignee=user).values_list('task_id', flat=True)
+        }
+
+    def allowed(event):
+        if event.kind == 'deleted':
+            return True
+        if event.kind == 'comment':
+            return event.task_id in assigned
+        return sees_all_tasks(user) or event.task_id in visible
+    return [event for event in events if allowed(event)]
+
+
+def make_stream_token(user):
+    """Signed, short-lived token that lets ``user`` open an event stream"""
+    return signing.dumps(user.pk, salt=STREAM_TOKEN_SALT, compress=True)
+
+
+def stream_token_user_id(token):
+    """User id of a stream token. Raises signing.BadSignature if invalid or expired"""
+    return signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=STREAM_TOKEN_MAX_AGE)
+
+
+def format_event(event):
+    """One SSE message; the id lets the browser resume with Last-Event-ID"""
+    data = json.dumps({'type': event.kind, 'task_id': event.task_id, 'status': event.status})
+    return f'id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n'
+
+
+class EventBroadcaster:
+    """Fans new task events out to the streams connected to this process"""
+
+    def __init__(self, poll_interval=POLL_INTERVAL, buffer_size=BUFFER_SIZE):
+        self.poll_interval = poll_interval
+        self.buffer = deque(maxlen=buffer_size)
+        self.last_id = None
+        self.listeners = 0
+        self._loop = None
+        self._changed = None
+        self._poller = None
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First stream, or a new event loop: start over on this one
+            self._loop = loop
+            self._changed = asyncio.Event()
+            self._poller = None
+            self.buffer.clear()
+            self.last_id = None
+        if self.last_id is None:
+            self.last_id = (await TaskEvent.objects.aaggregate(last=Max('id')))['last'] or 0
+        if self._poller is None or self._poller.done():
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        # Stops once the last stream disconnects; the next one restarts it
+        failures = 0
+        while self.listeners:
+            try:
+                events = [
+                    event async for event in
+                    TaskEvent.objects.filter(id__gt=self.last_id).order_by('id')[:BATCH_SIZE]
+                ]
+            except Exception as e:
+                # e.g. "database is locked"; keep polling so streams don't go quiet
+                failures += 1
+                backoff = min(self.poll_interval * 2 ** failures, MAX_POLL_BACKOFF)
+                logger.error(f"Event poll failed ({failures} in a row), retrying in {backoff:.1f}s: {str(e)}")
+                await asyncio.sleep(backoff)
+                continue
+            failures = 0
+            if events:
+                self.buffer.extend(events)
+                self.last_id = events[-1].id
+                changed, self._changed = self._changed, asyncio.Event()
+                changed.set()
+            if len(events) < BATCH_SIZE:
+                await asyncio.sleep(self.poll_interval)
+
+    async def listen(self, last_event_id=None, heartbeat=HEARTBEAT_INTERVAL):
+        """Yield lists of events after ``last_event_id`` (default: from now on).
+
+        An empty list means nothing happened for ``heartbeat`` seconds.
+        """
+        self.listeners += 1
+        try:
+            await self._start()
+            cursor = self.last_id if last_event_id is None else last_event_id
+            while True:
+                changed = self._changed
+                if cursor >= self.last_id or (self.buffer and cursor >= self.buffer[0].id - 1):
+                    events = [event for event in self.buffer if event.id > cursor]
+                else:
+                    # Resuming from before the buffer: replay the gap from the table
+                    events = [
+                        event async for event in
+                        TaskEvent.objects.filter(id__gt=cursor, id__lte=self.last_id).order_by('id')[:BATCH_SIZE]
+                    ]
+                    if not events:
+                        # Nothing stored in the gap (pruned or rolled-back ids)
+                        cursor = self.last_id
+                        continue
+                if events:
+                    cursor = events[-1].id
+                    yield events
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield []
+        finally:
+            self.listeners -= 1
+
+
+broadcaster = EventBroadcaster()
@@ -0,0 +1,117 @@
+# task/exports.py
+import csv
+import json
+import zlib
+
+from .models import Task, TaskAssignment, TaskHistory
+
+# Rows fetched per database round trip and bytes buffered per response chunk
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+
+# dataset -> (model, exported columns, column compared against ``since``)
+DATASETS = {
+    'tasks': (Task, [
+        'id', 'title', 'description', 'priority', 'status', 'due_date', 'completed_at',
+        'created_by', 'created_at', 'updated_at', 'reminder1', 'reminder2', 'parent_task_id',
+    ], 'updated_at'),
+    'assignments': (TaskAssignment, [
+        'id', 'task_id', 'assignee_id', 'assignee__email', 'department', 'assigned_at', 'completed_at',
+    ], 'assigned_at'),
+    'history': (TaskHistory, [
+        'id', 'task_id', 'action', 'performed_by__email', 'timestamp', 'details', 'comment',
+    ], 'timestamp'),
+}
+
+# HODs do not see follow-up comments, which live in these history columns
+HOD_HIDDEN_COLUMNS = {'details', 'comment'}
+
+
+def export_rows(dataset, user, since=None):
+    """Return the column names and a lazy row iterator for one dataset.
+
+    Rows are plain tuples read with a chunked server-side ``.iterator()`` and
+    restricted to the tasks the user may see.
+    """
+    model, columns, since_column = DATASETS[dataset]
+    if dataset == 'history' and user.role == 'hod':
+        columns = [c for c in columns if c not in HOD_HIDDEN_COLUMNS]
+
+    if hasattr(model.objects, 'visible_to'):
+        queryset = model.objects.visible_to(user)
+    else:
+        queryset = model.objects.filter(task__in=Task.objects.visible_to(user).values('pk'))
+
+    if since is not None:
+        queryset = queryset.filter(**{f'{since_column}__gt': since})
+
+    rows = queryset.order_by(since_column, 'id').values_list(*columns)
+    # Related lookups are exported as e.g. assignee_email
+    names = [column.replace('__', '_') for column in columns]
+    return names, rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _format(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    """Yield CSV text in buffered chunks"""
+    writer = csv.writer(_Echo())
+    buffer = [writer.writerow(columns)]
+    size = 0
+    for row in rows:
+        line = writer.writerow([_format(value) for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
+
+
+def iter_ndjson(columns, rows):
+    """Yield newline-delimited JSON objects in buffered chunks"""
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, row)), default=_json_default) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """Gzip a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
@@ -0,0 +1,78 @@
+# task/filters.py
+from datetime import datetime, time
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Task, TaskAssignment
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_choice_list(name, value, choices):
+    values = _split(value)
+    valid = dict(choices).keys()
+    for item in values:
+        if item not in valid:
+            raise ValueError(f"Invalid {name} '{item}'")
+    return values
+
+
+def parse_datetime_param(name, value, end_of_day=False):
+    """Parse an ISO date or datetime query parameter into an aware datetime"""
+    try:
+        day = parse_date(value)
+        parsed = None if day else parse_datetime(value)
+    except ValueError:
+        day = parsed = None
+    if day is not None:
+        # A bare date covers the whole day
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    elif parsed is None:
+        raise ValueError(f"Invalid {name} '{value}'")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_tasks(queryset, params):
+    """Apply the server-side task filters found in ``params``.
+
+    Supported parameters: ``status`` and ``priority`` (comma separated),
+    ``due_after``/``due_before`` (ISO date or datetime), ``created_by`` and
+    ``department`` (comma separated). Raises ValueError on invalid input.
+    """
+    if params.get('status'):
+        queryset = queryset.filter(
+            status__in=_parse_choice_list('status', params['status'], Task.STATUS_CHOICES)
+        )
+
+    if params.get('priority'):
+        queryset = queryset.filter(
+            priority__in=_parse_choice_list('priority', params['priority'], Task.PRIORITY_CHOICES)
+        )
+
+    if params.get('due_after'):
+        queryset = queryset.filter(due_date__gte=parse_datetime_param('due_after', params['due_after']))
+
+    if params.get('due_before'):
+        queryset = queryset.filter(
+            due_date__lte=parse_datetime_param('due_before', params['due_before'], end_of_day=True)
+        )
+
+    if params.get('created_by'):
+        queryset = queryset.filter(created_by=params['created_by'])
+
+    if params.get('department'):
+        # EXISTS keeps one row per task, so no DISTINCT is needed
+        queryset = queryset.filter(Exists(
+            TaskAssignment.objects.filter(
+                task=OuterRef('pk'),
+                department__in=_split(params['department'])
+            )
+        ))
+
+    return queryset
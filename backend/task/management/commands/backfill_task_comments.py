@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from task.models import TaskHistory, TaskComment
+import time
+
+class Command(BaseCommand):
+    help = 'Copy follow-up comments stored on task history (JSON details or the comment column) into task_comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Comments written per INSERT (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        # History rows already linked to a comment are skipped, so reruns are safe
+        pending = TaskHistory.objects.filter(
+            Q(details__has_key='follow_comment') | (Q(comment__isnull=False) & ~Q(comment='')),
+            follow_comment__isnull=True
+        ).only('id', 'task_id', 'performed_by_id', 'timestamp', 'details', 'comment').order_by('id')
+
+        created = 0
+        batch = []
+        for entry in pending.iterator(chunk_size=batch_size):
+            text = (entry.comment or entry.details.get('follow_comment') or '').strip()
+            if not text:
+                continue
+            batch.append(TaskComment(
+                task_id=entry.task_id,
+                history_id=entry.id,
+                author_id=entry.performed_by_id,
+                comment=text,
+                timestamp=entry.timestamp
+            ))
+            if len(batch) >= batch_size:
+                created += self.write(batch)
+                batch = []
+        if batch:
+            created += self.write(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backfilled {created} follow-up comment(s) in {(time.monotonic() - started) * 1000:.0f} ms"
+            )
+        )
+
+    def write(self, batch):
+        with transaction.atomic():
+            TaskComment.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
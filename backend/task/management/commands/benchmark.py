@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from task.benchmarks import SCENARIOS, throwaway_database
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark against a throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS), help='Benchmark to run')
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated data set sizes (default: 1000,10000,100000)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError(f"Invalid --sizes '{options['sizes']}'")
+
+        with throwaway_database():
+            SCENARIOS[options['scenario']](sizes, self.stdout.write)
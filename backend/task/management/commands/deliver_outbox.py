@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from task.outbox import run_worker, DEFAULT_MAX_ATTEMPTS
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the outbox over a reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails sent per connection')
+        parser.add_argument('--interval', type=int, default=5, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=DEFAULT_MAX_ATTEMPTS,
+            help='Failed deliveries before an email is dead-lettered'
+        )
+        parser.add_argument('--once', action='store_true', help='Deliver a single batch and exit')
+
+    def report(self, stats, metrics, duration):
+        if not (stats.sent or stats.retried or stats.dead) and not self.verbose:
+            return
+        self.stdout.write(
+            f'[{timezone.now():%Y-%m-%d %H:%M:%S}] sent={stats.sent} retried={stats.retried} '
+            f'dead={stats.dead} batch_ms={duration * 1000:.1f} max_latency_s={stats.max_latency:.1f} '
+            f'queue_depth={metrics.depth} oldest_pending_s={metrics.oldest_age:.1f} '
+            f'dead_letters={metrics.dead}'
+        )
+
+    def handle(self, *args, **options):
+        self.verbose = options['verbosity'] > 1 or options['once']
+        run_worker(
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+            max_attempts=options['max_attempts'],
+            once=options['once'],
+            report=self.report
+        )
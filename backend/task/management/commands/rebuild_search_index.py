@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from task.models import Task
+from task.search import rebuild_search_index
+import time
+
+class Command(BaseCommand):
+    help = 'Create the task full-text search index if needed and refill it from existing tasks'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if not rebuild_search_index():
+            raise CommandError('Full-text search needs SQLite with FTS5; search falls back to icontains')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {Task.objects.count()} tasks in {(time.monotonic() - started) * 1000:.0f} ms"
+            )
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from task.changes import prune_tombstones
+from task.events import prune_events
+from task.overdue import sweep_overdue_tasks
+import time
+
+class Command(BaseCommand):
+    help = 'Mark every task past its due date as overdue in one bulk update'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running and sweep every N seconds (default: sweep once and exit)'
+        )
+        parser.add_argument(
+            '--no-notify',
+            action='store_true',
+            help='Update statuses and history without sending status emails'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        notify = not options['no_notify']
+
+        while True:
+            try:
+                result = sweep_overdue_tasks(notify=notify)
+                # Retention cleanup runs here, outside any writer's transaction
+                pruned_events = prune_events()
+                pruned_tombstones = prune_tombstones()
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'[{timezone.now():%Y-%m-%d %H:%M:%S}] Marked {result.changed} task(s) overdue '
+                        f'in {result.duration * 1000:.1f} ms; pruned {pruned_events} stream event(s) '
+                        f'and {pruned_tombstones} tombstone(s)'
+                    )
+                )
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Overdue sweep failed: {str(e)}'))
+                if not interval:
+                    raise
+
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Q
+
+BATCH_SIZE = 1000
+
+
+def backfill_task_comments(apps, schema_editor):
+    """Copy follow-up comments recorded on task history into task_comments"""
+    TaskHistory = apps.get_model('task', 'TaskHistory')
+    TaskComment = apps.get_model('task', 'TaskComment')
+    using = schema_editor.connection.alias
+
+    # Same selection as the backfill_task_comments command, so either can run first
+    pending = TaskHistory.objects.using(using).filter(
+        Q(details__has_key='follow_comment') | (Q(comment__isnull=False) & ~Q(comment='')),
+        follow_comment__isnull=True
+    ).only('id', 'task_id', 'performed_by_id', 'timestamp', 'details', 'comment').order_by('id')
+
+    batch = []
+    for entry in pending.iterator(chunk_size=BATCH_SIZE):
+        text = (entry.comment or entry.details.get('follow_comment') or '').strip()
+        if not text:
+            continue
+        batch.append(TaskComment(
+            task_id=entry.task_id,
+            history_id=entry.id,
+            author_id=entry.performed_by_id,
+            comment=text,
+            timestamp=entry.timestamp
+        ))
+        if len(batch) >= BATCH_SIZE:
+            TaskComment.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TaskComment.objects.using(using).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0002_comments_events_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_task_comments, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,63 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q, Prefetch
+
+# Number of history entries embedded in the task detail payload
+HISTORY_PREVIEW_SIZE = 10
+
+
+def sees_all_tasks(user):
+    """Admin and staff see every task"""
+    return user.role in ['admin', 'staff'] or user.is_superuser
+
+
+class VisibleToQuerySet(models.QuerySet):
+    """Role-based visibility for rows that belong to a task.
+
+    HODs see tasks assigned into their department and faculty see tasks
+    assigned to them. Both rules are correlated EXISTS subqueries on
+    task_assignments, so the result never needs a join + DISTINCT.
+    """
+    
+    # Field of this model holding the task id
+    task_ref = 'pk'
+    
+    def visible_to(self, user):
+        if sees_all_tasks(user):
+            return self.all()
+        if user.role == 'hod':
+            return self.filter(Exists(
+                TaskAssignment.objects.filter(department=user.department, task=OuterRef(self.task_ref))
+            ))
+        if user.role == 'faculty':
+            return self.filter(Exists(
+                TaskAssignment.objects.filter(task=OuterRef(self.task_ref), assignee=user)
+            ))
+        return self.none()
+
+
+class TaskQuerySet(VisibleToQuerySet):
+    """Visibility and the prefetch shapes used by the task serializers"""
+    
+    def for_list(self):
+        """Everything TaskSerializer reads, loaded in one extra query"""
+        return self.prefetch_related(
+            Prefetch('assignments', queryset=TaskAssignment.objects.select_related('assignee'))
+        )
+    
+    def for_detail(self):
+        """Everything TaskDetailSerializer reads, loaded in a fixed number of queries"""
+        return self.for_list().prefetch_related(
+            Prefetch(
+                'history',
+                queryset=TaskHistory.objects.select_related('performed_by')
+                .order_by('-timestamp')[:HISTORY_PREVIEW_SIZE],
+                to_attr='recent_history'
+            ),
+            Prefetch('attachments', queryset=TaskAttachment.objects.select_related('uploaded_by')),
+        )
+
 
 class Task(models.Model):
     """Main task model with hierarchical delegation support"""
@@ -47,6 +103,8 @@ class Task(models.Model):
     # Keep track of previous status to detect changes
     _original_status = None
     
+    objects = TaskQuerySet.as_manager()
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Store the original status when instance is loaded
@@ -56,11 +114,12 @@ class Task(models.Model):
         db_table = 'tasks'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['-created_at']),
+            models.Index(fields=['-created_at', '-id']),  # Keyset pagination on (created_at, id)
             models.Index(fields=['priority']),
             models.Index(fields=['status']),
             models.Index(fields=['due_date']),
             models.Index(fields=['created_by']),
+            models.Index(fields=['updated_at']),  # Incremental change pickup
             models.Index(fields=['reminder1']),  # NEW: Index for reminders
             models.Index(fields=['reminder2']),  # NEW: Index for reminders
         ]
@@ -68,64 +127,59 @@ class Task(models.Model):
     def __str__(self):
         return self.title
     
-    def save(self, *args, **kwargs):
-        """Override save method to handle status change emails"""
-        from .utils import send_status_update_email
-        
-        # Detect if status has changed
-        status_changed = self.pk is not None and self._original_status != self.status
-        
-        # Perform standard save
-        result = super().save(*args, **kwargs)
+    def is_visible_to(self, user):
+        """Whether ``user`` may see this task; free when assignments are prefetched"""
+        if sees_all_tasks(user):
+            return True
+        if user.role not in ['hod', 'faculty']:
+            return False
+        if 'assignments' in getattr(self, '_prefetched_objects_cache', {}):
+            if user.role == 'hod':
+                return any(a.department == user.department for a in self.assignments.all())
+            return any(a.assignee_id == user.id for a in self.assignments.all())
+        return Task.objects.visible_to(user).filter(pk=self.pk).exists()
+    
+    def save(self, *args, notify=True, **kwargs):
+        """Save in a single write and queue status change emails on commit.
+
+        Pass ``notify=False`` to skip the emails, e.g. when a batch caller
+        sends its own coalesced notifications.
+        """
+        old_status = self._original_status
+        status_changed = self.pk is not None and old_status != self.status
         
-        # Handle completion logic
+        # Handle completion logic before the write so one UPDATE covers it
         if self.status == 'completed' and not self.completed_at:
             self.completed_at = timezone.now()
-            # Save again if we updated completed_at
-            if 'update_fields' not in kwargs or 'completed_at' not in kwargs['update_fields']:
-                super().save(update_fields=['completed_at'])
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'completed_at' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'completed_at']
         
-        # Send notifications if status changed
-        if status_changed:
-            try:
-                # Get all assignees for this task
-                for assignment in self.assignments.select_related('assignee').all():
-                    send_status_update_email(
-                        task=self,
-                        assignee=assignment.assignee,
-                        old_status=self._original_status,
-                        new_status=self.status
-                    )
-            except Exception as e:
-                print(f"Error sending status change email: {str(e)}")
+        result = super().save(*args, **kwargs)
         
         # Update our status tracker
         self._original_status = self.status
         
+        # Send notifications once the change is committed
+        if status_changed and notify:
+            new_status = self.status
+            transaction.on_commit(
+                lambda: self.queue_status_update_emails(old_status, new_status),
+                robust=True
+            )
+        
         return result
     
-    def update_status(self):
-        """Auto-update status based on due date"""
+    def queue_status_update_emails(self, old_status, new_status):
+        """Queue status update emails for every assignee"""
+        from .outbox import enqueue_emails
+        from .utils import build_status_update_emails
+        
         try:
-            if self.status != 'completed' and self.due_date:
-                # Ensure both datetimes are timezone-aware
-                now = timezone.now()
-                due_date = self.due_date
-                
-                # Make due_date timezone-aware if it isn't
-                if timezone.is_naive(due_date):
-                    due_date = timezone.make_aware(due_date)
-                
-                if now > due_date:
-                    old_status = self.status
-                    self.status = 'overdue'
-                    self.save()
-                    
-                    # Status updated notification happens in save method
-            
+            pairs = [(self, a.assignee) for a in self.assignments.select_related('assignee')]
+            enqueue_emails(build_status_update_emails(pairs, old_status, new_status))
         except Exception as e:
-            # Log the error but don't break the API
-            print(f"Error updating task status for task {self.id}: {str(e)}")
+            print(f"Error sending status change email: {str(e)}")
 
 
 class TaskAssignment(models.Model):
@@ -146,13 +200,18 @@ class TaskAssignment(models.Model):
         unique_together = ['task', 'assignee']
         indexes = [
             models.Index(fields=['task', 'assignee']),
-            models.Index(fields=['department']),
+            # Covers the HOD visibility EXISTS (department = ? AND task_id = ?)
+            models.Index(fields=['department', 'task']),
         ]
     
     def __str__(self):
         return f"{self.task.title} -> {self.assignee.get_full_name()}"
 
 
+class TaskHistoryQuerySet(VisibleToQuerySet):
+    task_ref = 'task_id'
+
+
 class TaskHistory(models.Model):
     """Complete audit trail for all task changes"""
     
@@ -173,21 +232,99 @@ class TaskHistory(models.Model):
         null=True
     )
     timestamp = models.DateTimeField(auto_now_add=True)
-    details = models.JSONField(default=dict)  # Store change details, including follow_comment
+    details = models.JSONField(default=dict)  # Store change details
     comment = models.TextField(null=True, blank=True, help_text="Dedicated follow-up comment or note")
     
+    objects = TaskHistoryQuerySet.as_manager()
+    
     class Meta:
         db_table = 'task_history'
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['task', '-timestamp']),
-            models.Index(fields=['details']),  # NEW: Index on JSON details for follow_comment queries
+            models.Index(fields=['-timestamp']),  # Recent activity feed
         ]
     
     def __str__(self):
         return f"{self.task.title} - {self.action} by {self.performed_by}"
 
 
+class TaskCommentQuerySet(models.QuerySet):
+    
+    def visible_to(self, user):
+        """Admins see every follow-up comment, HODs none, everyone else those on their tasks"""
+        if user.role == 'admin' or user.is_superuser:
+            return self.all()
+        if user.role == 'hod':
+            return self.none()
+        return self.filter(Exists(
+            TaskAssignment.objects.filter(task=OuterRef('task_id'), assignee=user)
+        ))
+
+
+class TaskComment(models.Model):
+    """Follow-up comment left on a task, linked to the history entry that recorded it"""
+    
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
+    history = models.OneToOneField(
+        TaskHistory,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='follow_comment'
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True
+    )
+    comment = models.TextField()
+    timestamp = models.DateTimeField(default=timezone.now)
+    
+    objects = TaskCommentQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'task_comments'
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['task', '-timestamp']),
+            # Matches the (timestamp, id) keyset order of the comment feed
+            models.Index(fields=['-timestamp', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.task.title} - comment by {self.author}"
+
+
+class TaskTombstone(models.Model):
+    """Marker left behind by a deleted task so change-feed clients can drop it.
+
+    Tombstones with a ``user`` or ``department`` mark a task that assignee,
+    or that department's HOD, may no longer see after an unassignment.
+    """
+    
+    task_id = models.IntegerField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    department = models.CharField(max_length=50, null=True, blank=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'task_tombstones'
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+    
+    def __str__(self):
+        return f"Task {self.task_id} deleted at {self.deleted_at}"
+
+
 class TaskAttachment(models.Model):
     """File attachments for tasks"""
     
@@ -206,4 +343,95 @@ class TaskAttachment(models.Model):
         ]
     
     def __str__(self):
-        return f"Attachment for {self.task.title} - {self.file.name}"
\ No newline at end of file
+        return f"Attachment for {self.task.title} - {self.file.name}"
+
+class OutboundEmail(models.Model):
+    """Email outbox drained by the deliver_outbox worker"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+    
+    subject = models.CharField(max_length=255)
+    html_message = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'email_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class NotificationLedger(models.Model):
+    """One row per reminder actually sent, so each one fires exactly once"""
+    
+    KIND_CHOICES = [
+        ('deadline', 'Deadline Reminder'),
+        ('reminder1', 'First Reminder'),
+        ('reminder2', 'Second Reminder'),
+        ('overdue', 'Overdue Notice'),
+    ]
+    
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='notifications')
+    assignee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='task_notifications'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    scheduled_for = models.DateTimeField(help_text="Instant the notification was scheduled for")
+    sent_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'notification_ledger'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['task', 'assignee', 'kind', 'scheduled_for'],
+                name='unique_notification_per_instant'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} for {self.task_id} -> {self.assignee_id} at {self.scheduled_for}"
+
+
+class TaskEvent(models.Model):
+    """Change event pushed to live dashboards over server-sent events"""
+    
+    KIND_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+        ('comment', 'Comment'),
+    ]
+    
+    # The autoincrement id orders events and is the SSE event id
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    task_id = models.IntegerField()
+    status = models.CharField(max_length=20, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'task_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} task {self.task_id}"
@@ -0,0 +1,314 @@
+# task/notifications.py
+import heapq
+import itertools
+import logging
+import math
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .changes import CHANGES_OVERLAP, prune_tombstones
+from .events import prune_events
+from .models import Task, TaskAssignment, NotificationLedger
+
+logger = logging.getLogger(__name__)
+
+# Deadline reminders go out every 4 hours during the last 24 hours
+DEADLINE_WINDOW = timedelta(hours=24)
+DEADLINE_INTERVAL = timedelta(hours=4)
+
+# Events up to this old are still fired after a restart
+DEFAULT_GRACE = timedelta(minutes=5)
+
+# Cron mode: custom reminders within this distance of "now" are due
+REMINDER_BUFFER = timedelta(minutes=5)
+
+# Overdue notices are owed only for tasks that fell due this recently. Older
+# tasks were overdue before the ledger existed (or before a long outage), and
+# mailing all of them at once would blow the mail quota.
+OVERDUE_NOTICE_WINDOW = timedelta(hours=24)
+
+REMINDER_LABELS = {
+    'reminder1': 'First Reminder',
+    'reminder2': 'Second Reminder',
+}
+
+Event = namedtuple('Event', ['fire_at', 'kind', 'task_id'])
+
+
+def task_events(task):
+    """Every notification event of a task, as (fire_at, kind) pairs.
+
+    Only pending tasks get reminders; the overdue transition is scheduled for
+    any task that is not completed yet.
+    """
+    events = []
+    if task.status == 'pending':
+        mark = task.due_date - DEADLINE_WINDOW
+        while mark < task.due_date:
+            events.append((mark, 'deadline'))
+            mark += DEADLINE_INTERVAL
+        for kind in ('reminder1', 'reminder2'):
+            fire_at = getattr(task, kind)
+            if fire_at:
+                events.append((fire_at, kind))
+    if task.status in ('pending', 'ongoing'):
+        events.append((task.due_date, 'overdue'))
+    return events
+
+
+def upcoming_tasks_query(start, end):
+    """Tasks with at least one event in [start, end), as an indexed range query"""
+    return Task.objects.filter(
+        Q(status__in=['pending', 'ongoing']),
+        Q(due_date__gte=start, due_date__lt=end + DEADLINE_WINDOW) |
+        Q(reminder1__gte=start, reminder1__lt=end) |
+        Q(reminder2__gte=start, reminder2__lt=end)
+    )
+
+
+def deadline_slot(due_date, now):
+    """The latest 4-hour reminder mark at or before ``now`` for a task due within 24 hours"""
+    intervals = math.ceil((due_date - now) / DEADLINE_INTERVAL)
+    return due_date - intervals * DEADLINE_INTERVAL
+
+
+def owed_notifications(kind, now, buffer=REMINDER_BUFFER):
+    """Assignments owed a ``kind`` notification that the ledger has no record of.
+
+    The ledger check is a NOT EXISTS anti-join on its unique index, so the
+    cost follows the new work rather than the size of the ledger.
+    """
+    # The overdue sweep may already have flipped the task; the ledger keeps
+    # the notice to one per assignee either way
+    statuses = ['pending', 'overdue'] if kind == 'overdue' else ['pending']
+    assignments = TaskAssignment.objects.filter(task__status__in=statuses)
+    sent = NotificationLedger.objects.filter(
+        task=OuterRef('task_id'),
+        assignee=OuterRef('assignee_id'),
+        kind=kind
+    )
+
+    if kind == 'deadline':
+        assignments = assignments.filter(
+            task__due_date__gt=now,
+            task__due_date__lte=now + DEADLINE_WINDOW
+        )
+        # Marks are 4 hours apart, so at most one can fall in this range
+        sent = sent.filter(scheduled_for__gt=now - DEADLINE_INTERVAL, scheduled_for__lte=now)
+    elif kind == 'overdue':
+        assignments = assignments.filter(
+            task__due_date__gte=now - OVERDUE_NOTICE_WINDOW,
+            task__due_date__lt=now
+        )
+        sent = sent.filter(scheduled_for=OuterRef('task__due_date'))
+    else:
+        assignments = assignments.filter(**{
+            f'task__{kind}__gte': now - buffer,
+            f'task__{kind}__lte': now + buffer,
+        })
+        sent = sent.filter(scheduled_for=OuterRef(f'task__{kind}'))
+
+    return assignments.filter(~Exists(sent)).select_related('task', 'assignee')
+
+
+def scheduled_instant(kind, task, now):
+    """The ledger instant of a ``kind`` notification for ``task``"""
+    if kind == 'deadline':
+        return deadline_slot(task.due_date, now)
+    if kind == 'overdue':
+        return task.due_date
+    return getattr(task, kind)
+
+
+def claim_notification(task, assignee, kind, scheduled_for):
+    """Record a notification in the ledger; False if it was already sent"""
+    try:
+        with transaction.atomic():
+            NotificationLedger.objects.create(
+                task=task,
+                assignee=assignee,
+                kind=kind,
+                scheduled_for=scheduled_for
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def send_notification(kind, task, assignee):
+    """Queue the email for one notification"""
+    from .utils import send_deadline_reminder_email, send_custom_reminder_email, send_overdue_notification
+
+    if kind == 'deadline':
+        send_deadline_reminder_email(task, assignee)
+    elif kind == 'overdue':
+        send_overdue_notification(task, assignee)
+    else:
+        send_custom_reminder_email(task, assignee, REMINDER_LABELS[kind])
+
+
+def send_owed_notifications(kind, now=None):
+    """Send every ``kind`` notification that is due and not yet in the ledger"""
+    now = now or timezone.now()
+    sent = 0
+    # Ledger rows and outbox rows commit together
+    with transaction.atomic():
+        for assignment in owed_notifications(kind, now).iterator():
+            task = assignment.task
+            if claim_notification(task, assignment.assignee, kind, scheduled_instant(kind, task, now)):
+                send_notification(kind, task, assignment.assignee)
+                sent += 1
+    return sent
+
+
+def dispatch_event(event, task, now=None):
+    """Send the notifications for one scheduler event; returns how many went out"""
+    from .overdue import sweep_overdue_tasks
+
+    if event.kind == 'overdue':
+        # One set-based sweep also catches anything else that just became
+        # overdue; the notices then go out through the same ledger claim as cron mode
+        sweep_overdue_tasks(now=now)
+        return send_owed_notifications('overdue', now)
+
+    sent = 0
+    with transaction.atomic():
+        for assignment in task.assignments.all():
+            if claim_notification(task, assignment.assignee, event.kind, event.fire_at):
+                send_notification(event.kind, task, assignment.assignee)
+                sent += 1
+    return sent
+
+
+class ReminderScheduler:
+    """Min-heap of upcoming notification events.
+
+    The heap is filled from an indexed range query over the next ``horizon``
+    and topped up by polling ``updated_at`` for tasks created or edited since
+    the last poll. Stale entries are skipped when popped by re-checking the
+    task's current events, so edits never need to remove anything.
+    """
+
+    def __init__(self, horizon=timedelta(hours=6), poll_interval=30, grace=DEFAULT_GRACE, report=None,
+                 clock=timezone.now):
+        self.horizon = horizon
+        self.poll_interval = poll_interval
+        self.grace = grace
+        self.report = report or (lambda message: logger.info(message))
+        self.clock = clock
+        self.heap = []
+        self.scheduled = set()
+        self.counter = itertools.count()
+        self.window_end = None
+        self.watermark = None
+        self.lags = []
+
+    def push(self, event):
+        if event in self.scheduled:
+            return
+        self.scheduled.add(event)
+        heapq.heappush(self.heap, (event.fire_at, next(self.counter), event))
+
+    def schedule_task(self, task, now):
+        """Queue the task's events that fall inside the loaded window"""
+        for fire_at, kind in task_events(task):
+            if now - self.grace <= fire_at < self.window_end:
+                self.push(Event(fire_at, kind, task.id))
+
+    def load(self, now):
+        """Load every event in [now - grace, now + horizon) with one range query"""
+        # The window slides every horizon / 2, which is often enough for the
+        # retention cleanup the write path leaves out
+        prune_events(now)
+        prune_tombstones(now)
+        self.window_end = now + self.horizon
+        # Fired events stay in ``scheduled`` while they could still be re-read
+        self.scheduled = {event for event in self.scheduled if event.fire_at >= now - self.grace}
+        tasks = upcoming_tasks_query(now - self.grace, self.window_end)
+        for task in tasks.only('id', 'status', 'due_date', 'reminder1', 'reminder2').iterator():
+            self.schedule_task(task, now)
+        if self.watermark is None:
+            self.watermark = now
+
+    def poll_changes(self, now):
+        """Pick up tasks created or edited since the last poll"""
+        # updated_at is stamped before commit, so re-read a short window behind
+        # the watermark; push() ignores events already queued or fired
+        changed = Task.objects.filter(updated_at__gt=self.watermark - CHANGES_OVERLAP).only(
+            'id', 'status', 'due_date', 'reminder1', 'reminder2', 'updated_at'
+        )
+        count = 0
+        for task in changed.iterator():
+            self.schedule_task(task, now)
+            self.watermark = max(self.watermark, task.updated_at)
+            count += 1
+        return count
+
+    def fire_due(self, now):
+        """Pop and dispatch every event whose time has come"""
+        fired = 0
+        while self.heap and self.heap[0][0] <= now:
+            _, _, event = heapq.heappop(self.heap)
+
+            task = Task.objects.prefetch_related('assignments__assignee').filter(id=event.task_id).first()
+            if task is None or (event.fire_at, event.kind) not in task_events(task):
+                # Task deleted, completed or rescheduled since this was queued
+                continue
+
+            lag = (now - event.fire_at).total_seconds()
+            self.lags.append(lag)
+            try:
+                sent = dispatch_event(event, task, now=now)
+                self.report(
+                    f"Fired {event.kind} for task {task.id} scheduled {event.fire_at:%Y-%m-%d %H:%M:%S} "
+                    f"(lag {lag:.1f}s, {sent} notification(s))"
+                )
+            except Exception as e:
+                logger.error(f"Error firing {event.kind} for task {task.id}: {str(e)}")
+            fired += 1
+        return fired
+
+    def lag_summary(self):
+        """Max and mean scheduling lag in seconds since the last summary"""
+        if not self.lags:
+            return None
+        summary = (max(self.lags), sum(self.lags) / len(self.lags), len(self.lags))
+        self.lags = []
+        return summary
+
+    def run(self, once=False):
+        """Fire events as they come due, sleeping until the next one"""
+        from .overdue import sweep_overdue_tasks
+
+        now = self.clock()
+        # Catch up on overdue transitions and notices missed while the scheduler was down
+        sweep_overdue_tasks(now=now)
+        send_owed_notifications('overdue', now)
+        self.load(now)
+        next_poll = now + timedelta(seconds=self.poll_interval)
+
+        while True:
+            now = self.clock()
+            if now >= next_poll:
+                self.poll_changes(now)
+                next_poll = now + timedelta(seconds=self.poll_interval)
+                summary = self.lag_summary()
+                if summary:
+                    self.report(f"Scheduling lag: max {summary[0]:.1f}s, mean {summary[1]:.1f}s over {summary[2]} event(s)")
+            if now >= self.window_end - self.horizon / 2:
+                # Slide the window forward before it runs dry
+                self.load(now)
+
+            self.fire_due(now)
+            if once:
+                return
+
+            wake_at = next_poll
+            if self.heap:
+                wake_at = min(wake_at, self.heap[0][0])
+            time.sleep(max((wake_at - self.clock()).total_seconds(), 0.05))
@@ -0,0 +1,177 @@
+# task/outbox.py
+import logging
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# Retry schedule: 1 min, 2 min, 4 min ... capped at one hour
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 60 * 60
+DEFAULT_MAX_ATTEMPTS = 8
+
+# A claimed row whose worker died is picked up again after this long
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+DeliveryStats = namedtuple('DeliveryStats', ['sent', 'retried', 'dead', 'max_latency'])
+OutboxMetrics = namedtuple('OutboxMetrics', ['depth', 'oldest_age', 'dead'])
+
+
+def build_email(subject, html_message, recipient_list):
+    """Build an unsaved outbox row; duplicate and empty recipients are dropped"""
+    return OutboundEmail(
+        subject=subject[:255],
+        html_message=html_message,
+        from_email=settings.DEFAULT_FROM_EMAIL or '',
+        recipients=sorted(set(filter(None, recipient_list)))
+    )
+
+
+def enqueue_emails(emails):
+    """Store outbox rows in the caller's transaction.
+
+    Nothing is sent here. The deliver_outbox worker picks the rows up once
+    the transaction commits, so a rollback also drops its emails. With
+    EMAIL_OUTBOX_EAGER the rows are delivered in-process right after commit
+    instead, which is handy when no worker is running.
+    """
+    emails = [email for email in emails if email.recipients]
+    if not emails:
+        return []
+    created = OutboundEmail.objects.bulk_create(emails)
+
+    if getattr(settings, 'EMAIL_OUTBOX_EAGER', False):
+        ids = [email.id for email in created]
+        transaction.on_commit(lambda: deliver_pending(ids=ids))
+    return created
+
+
+def enqueue_email(subject, html_message, recipient_list):
+    """Queue a single HTML email"""
+    return enqueue_emails([build_email(subject, html_message, recipient_list)])
+
+
+def _to_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body='',
+        from_email=email.from_email or None,
+        to=email.recipients,
+        connection=connection
+    )
+    message.attach_alternative(email.html_message, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    """Exponential backoff delay after ``attempts`` failed deliveries"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_email(email, now=None):
+    """Mark a due row as being sent; False if another worker claimed it first.
+
+    The conditional UPDATE only matches while the row still has the status
+    and next attempt time we read, so exactly one worker wins it.
+    """
+    now = now or timezone.now()
+    claimed = OutboundEmail.objects.filter(
+        id=email.id,
+        status=email.status,
+        next_attempt_at=email.next_attempt_at
+    ).update(status='sending', next_attempt_at=now + CLAIM_TIMEOUT)
+    return claimed == 1
+
+
+def deliver_pending(batch_size=100, max_attempts=DEFAULT_MAX_ATTEMPTS, ids=None):
+    """Deliver one batch of due outbox rows over a single SMTP connection.
+
+    Each row is claimed right before it is sent, so the worker and eager
+    on-commit delivery (or several workers) never send the same email twice.
+    Failed rows are rescheduled with exponential backoff and dead-lettered
+    after ``max_attempts`` tries.
+    """
+    now = timezone.now()
+    # Rows left 'sending' past their claim by a crashed worker are due again
+    pending = OutboundEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+    if ids is not None:
+        pending = pending.filter(id__in=ids)
+    batch = list(pending.order_by('next_attempt_at', 'id')[:batch_size])
+
+    sent = retried = dead = 0
+    max_latency = 0.0
+    if not batch:
+        return DeliveryStats(sent, retried, dead, max_latency)
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # The rows stay pending and are picked up by the next run
+        logger.error(f"Could not open mail connection: {str(e)}")
+        return DeliveryStats(sent, retried, dead, max_latency)
+
+    try:
+        for email in batch:
+            if not claim_email(email):
+                continue
+            try:
+                connection.send_messages([_to_message(email, connection)])
+            except Exception as e:
+                email.attempts += 1
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.status = 'dead'
+                    dead += 1
+                    logger.error(f"Dead-lettered email {email.id} after {email.attempts} attempts: {str(e)}")
+                else:
+                    email.status = 'pending'
+                    email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+                    retried += 1
+                    logger.warning(f"Email {email.id} failed (attempt {email.attempts}): {str(e)}")
+                email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+                continue
+
+            email.status = 'sent'
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.save(update_fields=['status', 'attempts', 'sent_at'])
+            sent += 1
+            max_latency = max(max_latency, (email.sent_at - email.created_at).total_seconds())
+    finally:
+        connection.close()
+
+    return DeliveryStats(sent, retried, dead, max_latency)
+
+
+def outbox_metrics():
+    """Queue depth, age of the oldest pending email in seconds and dead-letter count"""
+    pending = OutboundEmail.objects.filter(status__in=['pending', 'sending'])
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    return OutboxMetrics(
+        depth=pending.count(),
+        oldest_age=(timezone.now() - oldest).total_seconds() if oldest else 0.0,
+        dead=OutboundEmail.objects.filter(status='dead').count()
+    )
+
+
+def run_worker(batch_size=100, interval=5, max_attempts=DEFAULT_MAX_ATTEMPTS, once=False, report=None):
+    """Drain the outbox forever, sleeping ``interval`` seconds when it is empty"""
+    while True:
+        started = time.monotonic()
+        stats = deliver_pending(batch_size=batch_size, max_attempts=max_attempts)
+        if report:
+            report(stats, outbox_metrics(), time.monotonic() - started)
+        if once:
+            return stats
+        if stats.sent + stats.retried + stats.dead < batch_size:
+            time.sleep(interval)
@@ -0,0 +1,84 @@
+# task/overdue.py
+import time
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, TaskAssignment, TaskHistory
+from .counters import invalidate_all_counters
+from .events import record_events
+from .outbox import enqueue_emails
+
+# Statuses that flip to 'overdue' once the due date has passed
+OPEN_STATUSES = ['pending', 'ongoing']
+
+# Task ids per UPDATE, well under SQLite's bound-variable limit
+SWEEP_BATCH_SIZE = 500
+
+SweepResult = namedtuple('SweepResult', ['changed', 'duration'])
+
+
+def sweep_overdue_tasks(now=None, notify=True):
+    """Move every newly overdue task to 'overdue' with one set-based UPDATE.
+
+    History rows and status emails are written with bulk inserts in the same
+    transaction; the emails go out through the outbox worker, so read
+    endpoints never have to touch task status.
+    """
+    from .utils import build_status_update_emails
+
+    started = time.monotonic()
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        candidates = Task.objects.select_for_update().filter(
+            status__in=OPEN_STATUSES,
+            due_date__lt=now
+        )
+        old_statuses = dict(candidates.values_list('id', 'status'))
+
+        if not old_statuses:
+            return SweepResult(changed=0, duration=time.monotonic() - started)
+
+        # Update exactly the locked rows, so every flipped task gets its
+        # history row and emails below
+        task_ids = list(old_statuses)
+        changed = 0
+        for start in range(0, len(task_ids), SWEEP_BATCH_SIZE):
+            changed += Task.objects.filter(
+                id__in=task_ids[start:start + SWEEP_BATCH_SIZE]
+            ).update(status='overdue', updated_at=now)
+
+        TaskHistory.objects.bulk_create([
+            TaskHistory(
+                task_id=task_id,
+                action='status_changed',
+                performed_by=None,
+                details={
+                    'changes': {'status': {'old': old_status, 'new': 'overdue'}},
+                    'source': 'overdue_sweep'
+                }
+            )
+            for task_id, old_status in old_statuses.items()
+        ])
+
+        # The bulk UPDATE bypasses model signals
+        invalidate_all_counters()
+        record_events('updated', task_ids, status='overdue', now=now)
+
+        if notify:
+            # Group by previous status so recipients resolve in one pass per group
+            pairs_by_status = {}
+            for start in range(0, len(task_ids), SWEEP_BATCH_SIZE):
+                assignments = TaskAssignment.objects.filter(
+                    task_id__in=task_ids[start:start + SWEEP_BATCH_SIZE]
+                ).select_related('task', 'assignee')
+                for assignment in assignments:
+                    pairs_by_status.setdefault(old_statuses[assignment.task_id], []).append(
+                        (assignment.task, assignment.assignee)
+                    )
+            for old_status, pairs in pairs_by_status.items():
+                enqueue_emails(build_status_update_emails(pairs, old_status, 'overdue'))
+
+    return SweepResult(changed=changed, duration=time.monotonic() - started)
@@ -0,0 +1,87 @@
+# task/pagination.py
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(timestamp, pk):
+    """Build an opaque cursor token from the last row of a page"""
+    raw = json.dumps([timestamp.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Turn a cursor token back into its (timestamp, pk) pair"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(padded))
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError(timestamp)
+        return parsed, int(pk)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(f"Invalid cursor '{token}'") from e
+
+
+def get_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a page_size parameter, clamped to MAX_PAGE_SIZE"""
+    if value in (None, ''):
+        return default
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid page_size '{value}'")
+    if page_size < 1:
+        raise ValueError('page_size must be at least 1')
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def keyset_queryset(queryset, cursor=None, timestamp_field='created_at', id_field='id'):
+    """Order ``queryset`` newest first and seek past ``cursor``.
+
+    Rows are seeked with ``timestamp <= t AND (timestamp < t OR id < pk)`` so
+    every page is an index range scan, however deep the client pages.
+    """
+    queryset = queryset.order_by(f'-{timestamp_field}', f'-{id_field}')
+
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{timestamp_field}__lte': timestamp}),
+            Q(**{f'{timestamp_field}__lt': timestamp}) | Q(**{f'{id_field}__lt': pk})
+        )
+    return queryset
+
+
+def _page(rows, page_size, timestamp_field, id_field):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_field), getattr(last, id_field))
+    return rows, next_cursor
+
+
+def paginate_keyset(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                    timestamp_field='created_at', id_field='id'):
+    """Return one page of ``queryset`` newest first and the cursor for the next one"""
+    queryset = keyset_queryset(queryset, cursor, timestamp_field, id_field)
+    rows = list(queryset[:page_size + 1])
+    return _page(rows, page_size, timestamp_field, id_field)
+
+
+async def apaginate_keyset(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                           timestamp_field='created_at', id_field='id'):
+    """Async variant of paginate_keyset, fetching the page with ``aiterator``"""
+    queryset = keyset_queryset(queryset, cursor, timestamp_field, id_field)
+    rows = [row async for row in queryset[:page_size + 1].aiterator(chunk_size=page_size + 1)]
+    return _page(rows, page_size, timestamp_field, id_field)
@@ -0,0 +1,88 @@
+# task/recipients.py
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from staff.models import User
+
+# Safety net: reload the directory at least this often even without writes
+DIRECTORY_TIMEOUT = 60 * 60
+
+VERSION_KEY = 'recipients:version'
+
+
+def directory_version():
+    """Token that changes whenever a User is saved or deleted"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY) or version
+    return version
+
+
+def _directory_key():
+    return f'recipients:directory:{directory_version()}'
+
+
+def load_directory():
+    """Return ``{'hods': {department: email}, 'admins': [emails]}``, cached.
+
+    Loaded with two queries and reused until a User is saved or deleted.
+    """
+    key = _directory_key()
+    directory = cache.get(key)
+    if directory is None:
+        hods = {}
+        # Lowest id wins, matching the previous .filter(...).first() lookup
+        for department, email in User.objects.filter(
+            role='hod', department__isnull=False
+        ).order_by('id').values_list('department', 'email'):
+            if email:
+                hods.setdefault(department, email)
+
+        admins = sorted(set(filter(None, User.objects.filter(
+            Q(role='admin') | Q(is_superuser=True)
+        ).values_list('email', flat=True))))
+
+        directory = {'hods': hods, 'admins': admins}
+        cache.set(key, directory, DIRECTORY_TIMEOUT)
+    return directory
+
+
+def invalidate_directory():
+    """Drop the cached directory once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def hod_email(department):
+    """Email of the HOD of ``department``, or None"""
+    if not department:
+        return None
+    return load_directory()['hods'].get(department)
+
+
+def admin_emails():
+    """Emails of every admin and superuser"""
+    return list(load_directory()['admins'])
+
+
+def resolve_recipients(pairs, include_hod=True, include_admins=False):
+    """Resolve the recipient list for many (task, assignee) pairs in one pass.
+
+    Returns a list aligned with ``pairs``; each entry holds the assignee, the
+    HOD of the assignee's department and optionally every admin, de-duplicated.
+    """
+    directory = load_directory()
+    admins = directory['admins'] if include_admins else []
+
+    resolved = []
+    for _task, assignee in pairs:
+        recipients = [assignee.email]
+        if include_hod and assignee.department:
+            recipients.append(directory['hods'].get(assignee.department))
+        recipients.extend(admins)
+        resolved.append(sorted(set(filter(None, recipients))))
+    return resolved
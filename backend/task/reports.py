@@ -0,0 +1,118 @@
+# task/reports.py
+
+
+class StreamingPDFWriter:
+    """Minimal PDF writer that emits every page as soon as it is finished.
+
+    reportlab's canvas keeps the whole document in memory until save(). This
+    writer only remembers object offsets, so memory stays flat however many
+    pages are written. Pages hold plain Helvetica text lines.
+    """
+
+    PAGE_WIDTH = 595  # A4, like reportlab's default page size
+    PAGE_HEIGHT = 842
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+    FONT_ID = 3
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4
+
+    def _object(self, obj_id, body):
+        data = b'%d 0 obj\n' % obj_id + body + b'\nendobj\n'
+        self.offsets[obj_id] = self.offset
+        self.offset += len(data)
+        return data
+
+    def _allocate(self):
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    @staticmethod
+    def _escape(text):
+        text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        return text.replace('\r', ' ').replace('\n', ' ').encode('cp1252', 'replace')
+
+    def header(self):
+        """Bytes that start the document"""
+        data = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.offset += len(data)
+        return data + self._object(
+            self.FONT_ID,
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'
+        )
+
+    def page(self, lines, font_size=12):
+        """Bytes for one finished page; ``lines`` are (x, y, text) tuples"""
+        stream = b''.join(
+            b'BT /F1 %d Tf %d %d Td (%s) Tj ET\n' % (font_size, x, y, self._escape(text))
+            for x, y, text in lines
+        )
+        content_id = self._allocate()
+        page_id = self._allocate()
+        self.page_ids.append(page_id)
+        content = self._object(
+            content_id,
+            b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'endstream'
+        )
+        page = self._object(
+            page_id,
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+            % (self.PAGES_ID, self.PAGE_WIDTH, self.PAGE_HEIGHT, self.FONT_ID, content_id)
+        )
+        return content + page
+
+    def trailer(self):
+        """Bytes that close the document: page tree, catalog and xref table"""
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        data = self._object(
+            self.PAGES_ID,
+            b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids))
+        )
+        data += self._object(self.CATALOG_ID, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES_ID)
+
+        xref_offset = self.offset
+        size = self.next_id
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for obj_id in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self.offsets[obj_id])
+        xref.append(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (size, self.CATALOG_ID, xref_offset)
+        )
+        return data + b''.join(xref)
+
+
+def report_line(title, priority):
+    """Text of one task line in the report"""
+    return f"{title} - {priority}"
+
+
+def iter_task_report_pdf(queryset, chunk_size=2000):
+    """Yield the task report PDF page by page.
+
+    Tasks are read with a server-side ``.iterator()`` over plain value tuples,
+    so neither the rows nor the finished pages accumulate in memory.
+    """
+    writer = StreamingPDFWriter()
+    yield writer.header()
+
+    lines = [(100, 800, "Task Management Report")]
+    y = 770
+    rows = queryset.order_by('-created_at', '-id').values_list('title', 'priority')
+    for title, priority in rows.iterator(chunk_size=chunk_size):
+        if y < 100:
+            yield writer.page(lines)
+            lines = []
+            y = 800
+        lines.append((100, y, report_line(title, priority)))
+        y -= 20
+
+    yield writer.page(lines)
+    yield writer.trailer()
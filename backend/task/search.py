@@ -0,0 +1,175 @@
+# task/search.py
+import html
+import logging
+import re
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'task_search'
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Title matches weigh more than description matches in the bm25 rank
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Control characters mark the snippet highlights until the text is escaped
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+_TERM = re.compile(r'\w+')
+
+# Triggers keeping the index in step with every insert, update and delete on tasks
+SEARCH_TRIGGERS = [f'{SEARCH_TABLE}_ai', f'{SEARCH_TABLE}_ad', f'{SEARCH_TABLE}_au']
+
+# External-content FTS5 table over tasks(title, description) and its triggers
+SEARCH_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, description, content='tasks', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+
+def search_index_exists(using=connection):
+    """True when the FTS5 table and all its triggers are present on this (SQLite) database"""
+    if using.vendor != 'sqlite':
+        return False
+    names = [SEARCH_TABLE, *SEARCH_TRIGGERS]
+    with using.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})", names
+        )
+        return cursor.fetchone()[0] == len(names)
+
+
+def ensure_search_index(using=connection):
+    """Create the FTS5 table and triggers if missing; returns whether search is indexed.
+
+    A newly created or repaired index is refilled from the existing tasks.
+    Nothing is created until the tasks table exists. Non-SQLite databases,
+    or SQLite builds without FTS5, fall back to ``icontains``.
+    """
+    if using.vendor != 'sqlite':
+        return False
+    if search_index_exists(using):
+        return True
+    if Task._meta.db_table not in using.introspection.table_names():
+        return False
+    try:
+        # All or nothing, so a failure never leaves a table without triggers
+        with transaction.atomic(using=using.alias), using.cursor() as cursor:
+            for statement in SEARCH_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    except Exception as e:
+        logger.warning(f"Full-text search unavailable: {str(e)}")
+        return False
+    return True
+
+
+def rebuild_search_index(using=connection):
+    """Re-read every task into the FTS5 table"""
+    if not ensure_search_index(using):
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def parse_terms(query):
+    """Split a free-text query into search terms"""
+    return _TERM.findall(query.lower())
+
+
+def match_expression(terms):
+    """FTS5 MATCH expression requiring every term, each as a prefix"""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _highlight(snippet):
+    return html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_tasks_fts(user, terms, limit=DEFAULT_SEARCH_LIMIT):
+    """Rank visible tasks with FTS5/bm25; returns [(task_id, rank, title_snippet, snippet)]"""
+    visible = Task.objects.visible_to(user).query
+    visibility, visible_params = '', []
+    if visible.where:
+        # Check the role's visibility rule on each hit; "+rowid" keeps SQLite
+        # from pushing a list of visible ids into the FTS5 scan
+        visibility, visible_params = visible.get_compiler(connection=connection).compile(visible.where)
+        visibility = f'AND {visibility}'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT {SEARCH_TABLE}.rowid,
+                   bm25({SEARCH_TABLE}, %s, %s) AS rank,
+                   highlight({SEARCH_TABLE}, 0, %s, %s),
+                   snippet({SEARCH_TABLE}, 1, %s, %s, '…', 16)
+            FROM {SEARCH_TABLE}
+            JOIN tasks ON tasks.id = +{SEARCH_TABLE}.rowid
+            WHERE {SEARCH_TABLE} MATCH %s {visibility}
+            ORDER BY rank
+            LIMIT %s
+            """,
+            [
+                TITLE_WEIGHT, DESCRIPTION_WEIGHT,
+                _MARK_START, _MARK_END, _MARK_START, _MARK_END,
+                match_expression(terms), *visible_params, limit
+            ]
+        )
+        return [
+            (task_id, rank, _highlight(title), _highlight(snippet))
+            for task_id, rank, title, snippet in cursor.fetchall()
+        ]
+
+
+def search_tasks_icontains(user, terms, limit=DEFAULT_SEARCH_LIMIT):
+    """Fallback search with LIKE; title matches first, then newest"""
+    queryset = Task.objects.visible_to(user)
+    for term in terms:
+        queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    queryset = queryset.annotate(
+        title_match=Case(When(title__icontains=terms[0], then=Value(0)), default=Value(1), output_field=IntegerField())
+    ).order_by('title_match', '-created_at', '-id')
+    return [
+        (task_id, None, html.escape(title), html.escape(description[:120]))
+        for task_id, title, description in queryset.values_list('id', 'title', 'description')[:limit]
+    ]
+
+
+def search_tasks(user, query, limit=DEFAULT_SEARCH_LIMIT):
+    """Search the tasks ``user`` may see; returns (tasks, hits) in rank order.
+
+    ``hits`` maps task id to ``(rank, title_snippet, snippet)``; snippets are
+    HTML-escaped with matches wrapped in ``<mark>``.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return [], {}
+    if search_index_exists():
+        rows = search_tasks_fts(user, terms, limit)
+    else:
+        rows = search_tasks_icontains(user, terms, limit)
+    tasks = Task.objects.for_list().in_bulk([row[0] for row in rows])
+    return (
+        [tasks[row[0]] for row in rows if row[0] in tasks],
+        {task_id: (rank, title, snippet) for task_id, rank, title, snippet in rows}
+    )
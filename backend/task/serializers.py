@@ -1,6 +1,6 @@
 # task/serializers.py
 from rest_framework import serializers
-from .models import Task, TaskAssignment, TaskHistory, TaskAttachment
+from .models import Task, TaskAssignment, TaskHistory, TaskAttachment, HISTORY_PREVIEW_SIZE
 from staff.serializers import UserSerializer
 
 class TaskHistorySerializer(serializers.ModelSerializer):
@@ -31,12 +31,12 @@ class TaskSerializer(serializers.ModelSerializer):
             'completed_at', 'reminder1', 'reminder2'
         ]
     
+    # Getters only read prefetched data; build querysets with Task.objects.for_list()
     def get_department(self, obj):
-        departments = obj.assignments.values_list('department', flat=True).distinct()
-        return list(departments)
+        return list(dict.fromkeys(a.department for a in obj.assignments.all()))
     
     def get_assignee(self, obj):
-        assignments = obj.assignments.select_related('assignee').all()
+        assignments = obj.assignments.all()
         return [{
             'email': assignment.assignee.email,
             'full_name': assignment.assignee.get_full_name(),
@@ -57,14 +57,17 @@ class TaskDetailSerializer(serializers.ModelSerializer):
             'completed_at', 'reminder1', 'reminder2', 'history', 'attachments'
         ]
     
+    # Getters only read prefetched data; build querysets with Task.objects.for_detail()
     def get_department(self, obj):
-        return list(obj.assignments.values_list('department', flat=True).distinct())
+        return list(dict.fromkeys(a.department for a in obj.assignments.all()))
     
     def get_assignee(self, obj):
-        return list(obj.assignments.values_list('assignee__email', flat=True))
+        return [a.assignee.email for a in obj.assignments.all()]
     
     def get_history(self, obj):
-        history = obj.history.select_related('performed_by')[:10]
+        history = getattr(obj, 'recent_history', None)
+        if history is None:
+            history = obj.history.select_related('performed_by')[:HISTORY_PREVIEW_SIZE]
         return [{
             'action': h.action,
             'performed_by': h.performed_by.get_full_name() if h.performed_by else None,
@@ -113,6 +116,7 @@ class TaskCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """Create task with multiple assignments"""
         from staff.models import User
+        from .bulk import invalidate_assignment_counters, resolve_users_by_email
         
         # Pop assignment data
         assignees = validated_data.pop('assignee')
@@ -122,10 +126,13 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         # Create task with other fields including created_by
         task = Task.objects.create(**validated_data)
         
-        # Create assignments
+        # Create assignments, resolving every email in one query
+        users = resolve_users_by_email(assignees)
         assignments = []
         for email in assignees:
-            assignee = User.objects.get(email=email)
+            assignee = users.get(email)
+            if assignee is None:
+                raise User.DoesNotExist(f"User matching email '{email}' does not exist.")
             assignment = TaskAssignment(
                 task=task,
                 assignee=assignee,
@@ -136,6 +143,8 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         # Bulk create assignments
         TaskAssignment.objects.bulk_create(assignments)
         
+        invalidate_assignment_counters(assignments)
+        
         # Record creation history
         TaskHistory.objects.create(
             task=task,
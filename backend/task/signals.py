@@ -0,0 +1,71 @@
+# task/signals.py
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from staff.models import User
+from .models import Task, TaskAssignment, TaskComment
+from .changes import record_revocations, record_tombstones
+from .counters import invalidate_all_counters, invalidate_scopes, invalidate_task_counters
+from .events import record_events
+from .recipients import invalidate_directory
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """Refresh dashboard counters when a task is created or changes status, and publish the change"""
+    record_events('created' if created else 'updated', [instance.pk], status=instance.status)
+    if created:
+        # Assignments are usually bulk-created right after the task
+        invalidate_all_counters()
+    elif instance._original_status != instance.status:
+        invalidate_task_counters(instance)
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    """Refresh dashboard counters before the assignments cascade away, and leave a tombstone"""
+    invalidate_task_counters(instance)
+    record_tombstones([instance.pk])
+    record_events('deleted', [instance.pk])
+
+
+@receiver(post_save, sender=TaskComment)
+def comment_saved(sender, instance, created, **kwargs):
+    """Publish new follow-up comments to the event stream"""
+    if created:
+        record_events('comment', [instance.task_id])
+
+
+@receiver(post_save, sender=TaskAssignment)
+@receiver(post_delete, sender=TaskAssignment)
+def assignment_changed(sender, instance, **kwargs):
+    """Refresh the department and assignee counters an assignment belongs to"""
+    invalidate_scopes(
+        departments=[instance.department],
+        assignee_ids=[instance.assignee_id],
+        include_global=False
+    )
+
+
+@receiver(post_delete, sender=TaskAssignment)
+def assignment_deleted(sender, instance, origin=None, **kwargs):
+    """Leave a revocation tombstone when an assignee is removed from a task"""
+    # Deleting the task or the user cascades here too; the task tombstone
+    # covers the first, and the second has nobody left to tell
+    if getattr(origin, 'model', type(origin)) is TaskAssignment:
+        record_revocations([instance])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """Reload the HOD/admin recipient directory when a user changes"""
+    # Logins only touch last_login, which the directory does not use
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_directory()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Reload the HOD/admin recipient directory when a user is removed"""
+    invalidate_directory()
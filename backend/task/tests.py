@@ -1,3 +1,864 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from staff.models import User
+from .changes import encode_token
+from .models import Task, TaskAssignment, TaskHistory, TaskComment, TaskAttachment, OutboundEmail
+from .search import SEARCH_TABLE, ensure_search_index, search_index_exists
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTestCase(TestCase):
+    """Base class asserting that endpoints run a fixed number of queries.
+
+    Each check runs the request against a small data set, grows the data set
+    and runs it again with the same budget, so any per-row query shows up as
+    a failure.
+    """
+
+    small_size = 5
+    large_size = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin@example.com', 'pw', role='admin', department='OFFICE')
+        cls.staff = User.objects.create_user('staff@example.com', 'pw', role='staff', department='CSE')
+        cls.hod = User.objects.create_user('hod@example.com', 'pw', role='hod', department='CSE')
+        cls.faculty = User.objects.create_user('faculty@example.com', 'pw', role='faculty', department='CSE')
+        cls.other = User.objects.create_user('other@example.com', 'pw', role='faculty', department='ECE')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.created = 0
+
+    def create_tasks(self, count):
+        """Create tasks with assignments, history, comments and attachments"""
+        tasks = []
+        for _ in range(count):
+            self.created += 1
+            task = Task.objects.create(
+                title=f'Task {self.created}',
+                description='Description',
+                due_date=timezone.now() + timedelta(days=1),
+                created_by='Principal'
+            )
+            for user in (self.faculty, self.other):
+                TaskAssignment.objects.create(task=task, assignee=user, department=user.department)
+            TaskHistory.objects.create(task=task, action='created', performed_by=self.staff, details={})
+            history = TaskHistory.objects.create(
+                task=task,
+                action='updated',
+                performed_by=self.staff,
+                details={'changes': {}},
+                comment='Following up'
+            )
+            TaskComment.objects.create(task=task, history=history, author=self.staff, comment='Following up')
+            TaskAttachment.objects.create(
+                task=task,
+                file='task_attachments/report.pdf',
+                uploaded_by=self.staff,
+                file_name='report.pdf',
+                file_size=10
+            )
+            tasks.append(task)
+        return tasks
+
+    def assertQueryBudget(self, user, url_factory, budget):
+        """Assert ``budget`` queries for the URL both before and after the data grows"""
+        self.client.force_authenticate(user)
+        for size in (self.small_size, self.large_size - self.small_size):
+            # Run the on-commit cache invalidation so every request is a cold read
+            with self.captureOnCommitCallbacks(execute=True):
+                tasks = self.create_tasks(size)
+            url = url_factory(tasks[0])
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+
+
+class TaskEndpointQueryBudgetTests(QueryBudgetTestCase):
+
+    # Task list budgets include the ETag validator's count/max(updated_at) aggregate
+    def test_task_list(self):
+        for user in (self.admin, self.staff, self.hod, self.faculty):
+            with self.subTest(role=user.role):
+                self.assertQueryBudget(user, lambda task: '/api/tasks/', 3)
+
+    def test_task_list_page(self):
+        self.assertQueryBudget(self.staff, lambda task: '/api/tasks/?page_size=3&status=pending', 3)
+
+    def test_task_detail(self):
+        self.assertQueryBudget(self.staff, lambda task: f'/api/tasks/{task.id}/', 4)
+
+    def test_task_history(self):
+        # HODs do not get follow-up comments, so they skip the second query
+        for user, budget in ((self.admin, 2), (self.staff, 2), (self.hod, 1)):
+            with self.subTest(role=user.role):
+                self.assertQueryBudget(user, lambda task: '/api/tasks/history/', budget)
+
+    def test_task_history_comment_visibility(self):
+        from asgiref.sync import async_to_sync
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.create_tasks(1)
+        # A comment on a task assigned only to someone else
+        hidden = Task.objects.create(
+            title='Hidden', description='Description', due_date=timezone.now(), created_by='Principal'
+        )
+        TaskAssignment.objects.create(task=hidden, assignee=self.other, department='ECE')
+        TaskComment.objects.create(task=hidden, author=self.other, comment='Not for faculty')
+
+        self.client.force_authenticate(self.faculty)
+        sync_comments = self.client.get('/api/tasks/history/').data['follow_comments']
+        response = async_to_sync(self.async_client.get)(
+            '/api/async/tasks/history/',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.faculty)}'}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        for follow_comments in (sync_comments, response.json()['follow_comments']):
+            self.assertEqual([entry['comment'] for entry in follow_comments], ['Following up'])
+
+    def test_task_comments(self):
+        self.assertQueryBudget(self.staff, lambda task: f'/api/tasks/{task.id}/comments/', 2)
+
+    def test_all_follow_comments(self):
+        # Keyset pages skip the count; faculty are filtered with EXISTS, not a join
+        for user in (self.admin, self.faculty):
+            with self.subTest(role=user.role):
+                self.assertQueryBudget(user, lambda task: '/api/tasks/comments/', 1)
+
+    def test_all_follow_comments_rejects_page(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/tasks/comments/', {'page': 2})
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard(self):
+        for user in (self.admin, self.hod, self.faculty):
+            with self.subTest(role=user.role):
+                self.assertQueryBudget(user, lambda task: '/api/dashboard/', 1)
+
+    def test_dashboard_served_from_cache(self):
+        self.create_tasks(self.small_size)
+        self.client.force_authenticate(self.hod)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.get('/api/dashboard/').data
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/dashboard/').data
+        self.assertEqual(first, second)
+
+    def test_dashboard_invalidated_by_status_change(self):
+        task = self.create_tasks(self.small_size)[0]
+        self.client.force_authenticate(self.hod)
+        self.assertEqual(self.client.get('/api/dashboard/').data['completed_task'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = 'completed'
+            task.save()
+        self.assertEqual(self.client.get('/api/dashboard/').data['completed_task'], 1)
+
+    def test_user_list(self):
+        self.assertQueryBudget(self.staff, lambda task: '/api/auth/users/', 1)
+
+    def test_task_changes(self):
+        token = encode_token(timezone.now() - timedelta(minutes=1))
+        for user in (self.admin, self.faculty):
+            with self.subTest(role=user.role):
+                self.assertQueryBudget(user, lambda task: f'/api/tasks/changes/?since={token}', 4)
+
+    def test_task_changes_report_deletions(self):
+        self.client.force_authenticate(self.faculty)
+        token = self.client.get('/api/tasks/changes/').data['next']
+        kept, deleted = self.create_tasks(2)
+        deleted_id = deleted.id
+        deleted.delete()
+        response = self.client.get('/api/tasks/changes/', {'since': token})
+        self.assertFalse(response.data['reset'])
+        self.assertEqual([t['id'] for t in response.data['tasks']], [kept.id])
+        self.assertEqual([c['task_id'] for c in response.data['follow_comments']], [kept.id])
+        self.assertEqual(response.data['deleted'], [deleted_id])
+
+    def test_task_changes_report_unassignment(self):
+        from .bulk import sync_task_assignees
+        task = self.create_tasks(1)[0]
+        tokens = {}
+        for user in (self.faculty, self.hod, self.other):
+            self.client.force_authenticate(user)
+            tokens[user.email] = self.client.get('/api/tasks/changes/').data['next']
+        # Removing the only CSE assignee hides the task from them and their HOD
+        sync_task_assignees(task, [self.other.email])
+        for user, deleted in ((self.faculty, [task.id]), (self.hod, [task.id]), (self.other, [])):
+            with self.subTest(role=user.role, department=user.department):
+                self.client.force_authenticate(user)
+                response = self.client.get('/api/tasks/changes/', {'since': tokens[user.email]})
+                self.assertEqual(response.data['deleted'], deleted)
+
+    def test_task_update_rejects_bad_due_date(self):
+        task = self.create_tasks(1)[0]
+        self.client.force_authenticate(self.staff)
+        response = self.client.put(
+            f'/api/tasks/{task.id}/', {'assignee': [self.other.email], 'due_date': 'not a date'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(task.assignments.filter(assignee=self.faculty).exists())
+
+    def test_task_update_rolls_back_assignees(self):
+        import contextlib
+        import io
+        from unittest import mock
+        from django.db import DatabaseError
+        task = self.create_tasks(1)[0]
+        self.client.force_authenticate(self.staff)
+        # The history insert fails after the assignees were synced
+        failing = mock.patch.object(TaskHistory.objects, 'create', side_effect=DatabaseError('disk I/O error'))
+        with failing, self.assertLogs('task.views', 'ERROR'), contextlib.redirect_stderr(io.StringIO()):
+            response = self.client.put(
+                f'/api/tasks/{task.id}/', {'assignee': [self.other.email], 'title': 'Renamed'}, format='json'
+            )
+        self.assertEqual(response.status_code, 500)
+        task.refresh_from_db()
+        self.assertNotEqual(task.title, 'Renamed')
+        self.assertTrue(task.assignments.filter(assignee=self.faculty).exists())
+
+    def test_task_update_keeps_existing_assignments(self):
+        task = self.create_tasks(1)[0]
+        kept = task.assignments.get(assignee=self.faculty)
+        self.client.force_authenticate(self.staff)
+        response = self.client.put(
+            f'/api/tasks/{task.id}/', {'assignee': [self.faculty.email, self.hod.email]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            set(task.assignments.values_list('assignee__email', flat=True)),
+            {self.faculty.email, self.hod.email}
+        )
+        same = task.assignments.get(assignee=self.faculty)
+        self.assertEqual((same.id, same.assigned_at), (kept.id, kept.assigned_at))
+
+    def test_bulk_update_filter_capped(self):
+        from unittest import mock
+        self.create_tasks(3)
+        self.client.force_authenticate(self.staff)
+        body = {'filter': {'status': 'pending'}, 'changes': {'priority': 'high'}}
+        with mock.patch('task.bulk.MAX_BULK_ITEMS', 2):
+            response = self.client.patch('/api/tasks/bulk/update/', body, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.filter(priority='high').exists())
+        with mock.patch('task.bulk.MAX_BULK_ITEMS', 3):
+            response = self.client.patch('/api/tasks/bulk/update/', body, format='json')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_bulk_create_partial_success(self):
+        self.client.force_authenticate(self.staff)
+
+        def item(title, assignee):
+            return {
+                'title': title, 'description': 'Description', 'department': ['CSE'], 'assignee': [assignee],
+                'due_date': (timezone.now() + timedelta(days=1)).isoformat(), 'created_by': 'Principal'
+            }
+        body = [
+            item('First', self.faculty.email),
+            item('Unknown assignee', 'nobody@example.com'),
+            item('', self.faculty.email),
+            item('Last', self.other.email),
+        ]
+        response = self.client.post('/api/tasks/bulk/', body, format='json')
+        self.assertEqual(response.status_code, 207, response.content)
+        # Errors keep the input order even though assignees are checked last
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('assignee', response.data['errors'][0]['errors'])
+        self.assertIn('title', response.data['errors'][1]['errors'])
+        created = Task.objects.filter(id__in=response.data['created'])
+        self.assertEqual(sorted(created.values_list('title', flat=True)), ['First', 'Last'])
+        self.assertEqual(TaskAssignment.objects.filter(task__in=created).count(), 2)
+
+    def test_event_stream_token(self):
+        from asgiref.sync import async_to_sync
+        from .events import stream_token_user_id
+        self.client.force_authenticate(self.faculty)
+        token = self.client.post('/api/tasks/events/token/').data['token']
+        self.assertEqual(stream_token_user_id(token), self.faculty.pk)
+        # Anything else in the URL, such as an access token, is refused
+        response = async_to_sync(self.async_client.get)('/api/async/events/', {'token': 'forged'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_conditional_get(self):
+        # Validators need at most one aggregate query and skip serialization
+        self.create_tasks(self.small_size)
+        self.client.force_authenticate(self.hod)
+        for url, budget in (('/api/tasks/', 1), ('/api/dashboard/', 0), ('/api/auth/users/', 0)):
+            with self.subTest(url=url):
+                with self.captureOnCommitCallbacks(execute=True):
+                    etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_task_list_etag_changes_on_update(self):
+        task = self.create_tasks(self.small_size)[0]
+        self.client.force_authenticate(self.staff)
+        etag = self.client.get('/api/tasks/')['ETag']
+        Task.objects.filter(id=task.id).update(title='Renamed', updated_at=timezone.now() + timedelta(seconds=1))
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_compressed_task_list(self):
+        # Large lists are compressed, the body still decodes to the stock JSON
+        import gzip
+        from rest_framework.renderers import JSONRenderer
+        self.create_tasks(self.small_size)
+        self.client.force_authenticate(self.staff)
+        plain = self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain.content, JSONRenderer().render(plain.data))
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+
+class RendererParityTests(SimpleTestCase):
+    """ORJSONRenderer must emit exactly the bytes of DRF's JSONRenderer"""
+
+    def test_same_bytes_as_drf(self):
+        import datetime
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from backend.renderers import ORJSONRenderer
+        payload = {
+            'due_date': datetime.datetime(2025, 3, 1, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'local': datetime.datetime(2025, 3, 1, 9, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))),
+            'day': datetime.date(2025, 3, 1),
+            'amount': Decimal('12.50'),
+            'label': gettext_lazy('Pending'),
+            'text': 'line\u2028separator\u2029end',
+            'nested': [{'id': 1, 'ok': True, 'missing': None}, 'é'],
+            7: 'numeric key',
+        }
+        self.assertEqual(ORJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RecipientDirectoryTests(TestCase):
+    """The cached HOD/admin directory and its version token follow User writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def save_user(self, callback):
+        # The new version is published once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return callback()
+
+    def test_user_writes_invalidate_directory(self):
+        from .recipients import directory_version, hod_email
+        hod = self.save_user(lambda: User.objects.create_user('hod@example.com', 'pw', role='hod', department='CSE'))
+        self.assertEqual(hod_email('CSE'), 'hod@example.com')
+        self.client.force_authenticate(hod)
+        etag = self.client.get('/api/auth/users/')['ETag']
+
+        # A new HOD elsewhere shows up without waiting for the timeout
+        self.save_user(lambda: User.objects.create_user('ece@example.com', 'pw', role='hod', department='ECE'))
+        self.assertEqual(hod_email('ECE'), 'ece@example.com')
+        self.assertNotEqual(self.client.get('/api/auth/users/')['ETag'], etag)
+
+        self.save_user(lambda: User.objects.get(email='ece@example.com').delete())
+        self.assertIsNone(hod_email('ECE'))
+
+        # Logins only touch last_login, so the directory and its ETags stay valid
+        from django.contrib.auth.models import update_last_login
+        version = directory_version()
+        self.save_user(lambda: update_last_login(None, hod))
+        self.assertEqual(directory_version(), version)
+        # A profile edit does change it
+        hod.first_name = 'Head'
+        self.save_user(hod.save)
+        self.assertNotEqual(directory_version(), version)
+
+
+class OutboxDeliveryTests(TestCase):
+    """Outbox rows are claimed before sending, so concurrent senders never duplicate"""
+
+    def test_claimed_email_sent_once(self):
+        from django.core import mail
+        from .outbox import CLAIM_TIMEOUT, claim_email, deliver_pending, enqueue_email
+        email = enqueue_email('Subject', '<p>Body</p>', ['faculty@example.com'])[0]
+        # Another sender claims the row first
+        self.assertTrue(claim_email(email))
+        self.assertFalse(claim_email(email))
+        self.assertEqual(deliver_pending().sent, 0)
+        self.assertEqual(len(mail.outbox), 0)
+        # Its claim runs out without the email being sent, so it is due again
+        email.refresh_from_db()
+        OutboundEmail.objects.filter(id=email.id).update(next_attempt_at=email.next_attempt_at - CLAIM_TIMEOUT)
+        self.assertEqual(deliver_pending().sent, 1)
+        self.assertEqual(deliver_pending().sent, 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class NotificationTests(TestCase):
+    """Overdue sweep, ledger-backed notices and the in-memory reminder schedule"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = User.objects.create_user('faculty@example.com', 'pw', role='faculty', department='CSE')
+
+    def create_task(self, due_date, status='pending', **fields):
+        task = Task.objects.create(
+            title='Task', description='Description', due_date=due_date, created_by='Principal',
+            status=status, **fields
+        )
+        TaskAssignment.objects.create(task=task, assignee=self.faculty, department='CSE')
+        return task
+
+    def test_sweep_marks_overdue_in_one_update(self):
+        from django.core import mail
+        from django.core.management import call_command
+        from django.test.utils import CaptureQueriesContext
+        now = timezone.now()
+        overdue = [self.create_task(now - timedelta(hours=hours)) for hours in (1, 2, 3)]
+        upcoming = self.create_task(now + timedelta(days=1))
+
+        with override_settings(EMAIL_OUTBOX_EAGER=True), self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                call_command('sweep_overdue_tasks', stdout=io.StringIO())
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "tasks"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            dict(Task.objects.values_list('id', 'status')),
+            {**{task.id: 'overdue' for task in overdue}, upcoming.id: 'pending'}
+        )
+        self.assertEqual(
+            TaskHistory.objects.filter(action='status_changed', details__source='overdue_sweep').count(), 3
+        )
+        # Status emails are stored with the sweep and only sent once it commits
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 3)
+        self.assertEqual(len(mail.outbox), 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 3)
+
+        out = io.StringIO()
+        call_command('sweep_overdue_tasks', stdout=out)
+        self.assertIn('Marked 0 task(s) overdue', out.getvalue())
+
+    def test_retention_left_to_the_sweep(self):
+        from django.core.management import call_command
+        from .changes import TOMBSTONE_RETENTION
+        from .events import EVENT_RETENTION
+        from .models import TaskEvent, TaskTombstone
+        task = self.create_task(timezone.now() + timedelta(days=1))
+        self.create_task(timezone.now()).delete()
+        expired_events = TaskEvent.objects.update(created_at=timezone.now() - EVENT_RETENTION - timedelta(hours=1))
+        TaskTombstone.objects.update(deleted_at=timezone.now() - TOMBSTONE_RETENTION - timedelta(hours=1))
+        # Writers only append
+        task.save()
+        self.create_task(timezone.now()).delete()
+        self.assertEqual(TaskEvent.objects.count(), expired_events + 3)
+        self.assertEqual(TaskTombstone.objects.count(), 2)
+
+        call_command('sweep_overdue_tasks', stdout=io.StringIO())
+        self.assertEqual(TaskEvent.objects.count(), 3)
+        self.assertEqual(TaskTombstone.objects.count(), 1)
+
+    def test_overdue_notice_skips_long_overdue_tasks(self):
+        from .models import NotificationLedger
+        from .notifications import OVERDUE_NOTICE_WINDOW, send_owed_notifications
+        now = timezone.now()
+        # Overdue long before the ledger existed, so it was never recorded there
+        self.create_task(now - OVERDUE_NOTICE_WINDOW - timedelta(days=2), status='overdue')
+        recent = self.create_task(now - timedelta(hours=1), status='overdue')
+
+        self.assertEqual(send_owed_notifications('overdue', now), 1)
+        self.assertEqual(list(NotificationLedger.objects.values_list('task_id', flat=True)), [recent.id])
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+        self.assertEqual(send_owed_notifications('overdue', now), 0)
+
+
+class ReminderSchedulerTests(TestCase):
+    """The daemon's in-memory schedule, driven by a fake clock"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = User.objects.create_user('faculty@example.com', 'pw', role='faculty', department='CSE')
+
+    def setUp(self):
+        from unittest import mock
+        from .notifications import ReminderScheduler
+        self.now = timezone.now()
+        self.fired = []
+        patcher = mock.patch('task.notifications.dispatch_event', side_effect=self.dispatch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = ReminderScheduler(clock=lambda: self.now, report=lambda message: None)
+
+    def dispatch(self, event, task, now=None):
+        self.fired.append((event.kind, task.id))
+        return 1
+
+    def create_task(self, **reminders):
+        # Due well past the horizon, so only the reminders are scheduled
+        task = Task.objects.create(
+            title='Task', description='Description', due_date=self.now + timedelta(days=10),
+            created_by='Principal', **reminders
+        )
+        TaskAssignment.objects.create(task=task, assignee=self.faculty, department='CSE')
+        return task
+
+    def test_events_fire_in_time_order(self):
+        late = self.create_task(reminder1=self.now + timedelta(hours=2))
+        early = self.create_task(reminder1=self.now + timedelta(hours=1), reminder2=self.now + timedelta(hours=3))
+        self.scheduler.run(once=True)
+        self.assertEqual(self.fired, [])
+
+        self.now += timedelta(hours=3)
+        self.assertEqual(self.scheduler.fire_due(self.now), 3)
+        self.assertEqual(self.fired, [('reminder1', early.id), ('reminder1', late.id), ('reminder2', early.id)])
+
+    def test_window_refill_loads_later_events(self):
+        task = self.create_task(reminder1=self.now + timedelta(hours=8))
+        self.scheduler.load(self.now)
+        self.assertEqual(self.scheduler.heap, [])
+
+        self.now += timedelta(hours=4)
+        self.scheduler.load(self.now)
+        self.now += timedelta(hours=4)
+        self.assertEqual(self.scheduler.fire_due(self.now), 1)
+        self.assertEqual(self.fired, [('reminder1', task.id)])
+
+    def test_edited_task_entry_dropped(self):
+        task = self.create_task(reminder1=self.now + timedelta(hours=1))
+        self.scheduler.load(self.now)
+        task.reminder1 = self.now + timedelta(hours=2)
+        task.save()
+
+        # The queued entry no longer matches the task, so it is skipped
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.scheduler.fire_due(self.now), 0)
+        self.scheduler.poll_changes(self.now)
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.scheduler.fire_due(self.now), 1)
+        self.assertEqual(self.fired, [('reminder1', task.id)])
+
+    def test_poll_picks_up_new_task(self):
+        self.scheduler.load(self.now)
+        task = self.create_task(reminder1=self.now + timedelta(minutes=30))
+        self.assertEqual(self.scheduler.poll_changes(self.now), 1)
+        # Re-reading the overlap window queues nothing twice
+        self.scheduler.poll_changes(self.now)
+
+        self.now += timedelta(minutes=30)
+        self.assertEqual(self.scheduler.fire_due(self.now), 1)
+        self.assertEqual(self.fired, [('reminder1', task.id)])
+
+
+class DatabaseProfileTests(TestCase):
+    """The SQLite connection profile, and migrations applied under it"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite profile only')
+
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+    def compat_connection(self):
+        """A connection to an empty database file, registered as 'compat' for this test"""
+        tmpdir = tempfile.mkdtemp(prefix='task-compat-')
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        compat = type(connections['default'])(
+            {**connection.settings_dict, 'NAME': os.path.join(tmpdir, 'compat.sqlite3')},
+            alias='compat'
+        )
+        # Migrations open transactions by alias, so register it for this test
+        connections['compat'] = compat
+        self.addCleanup(connections.__delitem__, 'compat')
+        self.addCleanup(compat.close)
+        return compat
+
+    def test_migrations_apply_under_profile(self):
+        compat = self.compat_connection()
+        executor = MigrationExecutor(compat)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+        self.assertEqual(compat.transaction_mode, 'IMMEDIATE')
+        with compat.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            tables = {row[0] for row in cursor.fetchall()}
+        self.assertTrue({'users', 'tasks', 'task_assignments', 'task_history', 'task_comments'} <= tables)
+        self.assertFalse(MigrationExecutor(compat).migration_plan(executor.loader.graph.leaf_nodes()))
+
+    def test_comment_backfill_migration(self):
+        compat = self.compat_connection()
+        before = [('task', '0002_comments_events_outbox')]
+        executor = MigrationExecutor(compat)
+        executor.migrate(before)
+        old_apps = executor.loader.project_state(before).apps
+        task = old_apps.get_model('task', 'Task').objects.using('compat').create(
+            title='Task', description='Description', due_date=timezone.now(), created_by='Principal'
+        )
+        history = old_apps.get_model('task', 'TaskHistory').objects.using('compat')
+        history.create(task=task, action='updated', details={'follow_comment': 'From the JSON'})
+        history.create(task=task, action='updated', details={}, comment='From the column')
+        history.create(task=task, action='updated', details={})
+
+        executor = MigrationExecutor(compat)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertEqual(
+            set(TaskComment.objects.using('compat').values_list('comment', flat=True)),
+            {'From the JSON', 'From the column'}
+        )
+
+    def test_search_index_waits_for_tasks_table(self):
+        compat = self.compat_connection()
+        # Before the tasks table exists nothing is created, not even the FTS5 table
+        self.assertFalse(ensure_search_index(compat))
+        self.assertNotIn(SEARCH_TABLE, compat.introspection.table_names())
+
+        executor = MigrationExecutor(compat)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertTrue(ensure_search_index(compat))
+        # A lost trigger is recreated instead of being hidden by the existing table
+        with compat.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {SEARCH_TABLE}_ai')
+        self.assertFalse(search_index_exists(compat))
+        self.assertTrue(ensure_search_index(compat))
+
+        Task.objects.using('compat').create(
+            title='Quarterly audit', description='Description', due_date=timezone.now(), created_by='Principal'
+        )
+        with compat.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH 'audit'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class ExportEndpointTests(TestCase):
+    """/api/tasks/export/<dataset>/ streams only what the user may see"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin@example.com', 'pw', role='admin', department='OFFICE')
+        cls.hod = User.objects.create_user('hod@example.com', 'pw', role='hod', department='CSE')
+        cls.faculty = User.objects.create_user('faculty@example.com', 'pw', role='faculty', department='CSE')
+        cls.other = User.objects.create_user('other@example.com', 'pw', role='faculty', department='ECE')
+        cls.old = cls.create_task('Old', cls.other)
+        cls.new = cls.create_task('New', cls.faculty)
+        # Everything about the old task last changed ten days ago
+        cls.cutoff = timezone.now() - timedelta(days=1)
+        stamp = timezone.now() - timedelta(days=10)
+        Task.objects.filter(id=cls.old.id).update(updated_at=stamp)
+        TaskAssignment.objects.filter(task=cls.old).update(assigned_at=stamp)
+        TaskHistory.objects.filter(task=cls.old).update(timestamp=stamp)
+
+    @classmethod
+    def create_task(cls, title, assignee):
+        task = Task.objects.create(
+            title=title, description='Description', due_date=timezone.now(), created_by='Principal'
+        )
+        TaskAssignment.objects.create(task=task, assignee=assignee, department=assignee.department)
+        TaskHistory.objects.create(
+            task=task, action='updated', performed_by=cls.admin,
+            details={'follow_comment': 'Private note'}, comment='Private note'
+        )
+        return task
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def export(self, user, dataset, **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/tasks/export/{dataset}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def export_csv(self, user, dataset, **params):
+        import csv
+        return list(csv.DictReader(io.StringIO(self.export(user, dataset, **params)[1].decode())))
+
+    def test_rows_restricted_to_visible_tasks(self):
+        for dataset, key in (('tasks', 'id'), ('assignments', 'task_id'), ('history', 'task_id')):
+            with self.subTest(dataset=dataset):
+                rows = self.export_csv(self.faculty, dataset)
+                self.assertEqual([int(row[key]) for row in rows], [self.new.id])
+                rows = self.export_csv(self.admin, dataset)
+                self.assertEqual(sorted(int(row[key]) for row in rows), sorted([self.old.id, self.new.id]))
+
+    def test_since_filters_each_dataset(self):
+        for dataset, key in (('tasks', 'id'), ('assignments', 'task_id'), ('history', 'task_id')):
+            with self.subTest(dataset=dataset):
+                rows = self.export_csv(self.admin, dataset, since=self.cutoff.isoformat())
+                self.assertEqual([int(row[key]) for row in rows], [self.new.id])
+
+    def test_ndjson(self):
+        response, body = self.export(self.admin, 'assignments', output='ndjson')
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(
+            {row['task_id']: row['assignee_email'] for row in rows},
+            {self.old.id: self.other.email, self.new.id: self.faculty.email}
+        )
+
+    def test_gzip_stream(self):
+        import gzip
+        _, plain = self.export(self.admin, 'history')
+        response, body = self.export(self.admin, 'history', gzip='true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('history.csv.gz', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_hod_history_omits_comment_columns(self):
+        rows = self.export_csv(self.hod, 'history')
+        self.assertEqual([int(row['task_id']) for row in rows], [self.new.id])
+        self.assertNotIn('details', rows[0])
+        self.assertNotIn('comment', rows[0])
+        self.assertIn('comment', self.export_csv(self.admin, 'history')[0])
+
+
+class TaskReportPDFTests(TestCase):
+    """The streaming PDF writer produces a well-formed document"""
+
+    def test_streamed_report_is_well_formed(self):
+        import re
+        from .reports import iter_task_report_pdf
+        for number in range(40):
+            Task.objects.create(
+                title=f'Budget (draft {number})', description='Description', due_date=timezone.now(),
+                created_by='Principal'
+            )
+        pdf = b''.join(iter_task_report_pdf(Task.objects.all(), chunk_size=7))
+
+        self.assertTrue(pdf.startswith(b'%PDF-'))
+        self.assertTrue(pdf.rstrip().endswith(b'%%EOF'))
+        # 40 lines do not fit on one page
+        self.assertIn(b'/Count 2', pdf)
+        self.assertIn(b'(Budget \\(draft 0\\) - medium) Tj', pdf)
+
+        xref_offset = int(re.search(rb'startxref\n(\d+)\n', pdf).group(1))
+        self.assertTrue(pdf[xref_offset:].startswith(b'xref\n'))
+        size = int(re.match(rb'xref\n0 (\d+)\n', pdf[xref_offset:]).group(1))
+        entries = re.findall(rb'(\d{10}) 00000 n ', pdf[xref_offset:])
+        self.assertEqual(len(entries), size - 1)
+        for obj_id, offset in enumerate(entries, start=1):
+            self.assertTrue(pdf[int(offset):].startswith(b'%d 0 obj\n' % obj_id), obj_id)
+
+
+class SearchEndpointTests(TestCase):
+    """/api/tasks/search/ ranking and visibility, with and without the FTS5 index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.faculty = User.objects.create_user('faculty@example.com', 'pw', role='faculty', department='CSE')
+        cls.other = User.objects.create_user('other@example.com', 'pw', role='faculty', department='ECE')
+        # Created first, so newest-first ordering alone would put it last
+        cls.title_hit = cls.create_task('Budget audit', 'Check the numbers', cls.faculty)
+        cls.description_hit = cls.create_task('Quarterly review', 'Includes an audit of expenses', cls.faculty)
+        cls.hidden = cls.create_task('Audit for ECE', 'Not assigned to faculty', cls.other)
+        cls.create_task('Lab schedule', 'Nothing to see', cls.faculty)
+
+    @staticmethod
+    def create_task(title, description, assignee):
+        task = Task.objects.create(
+            title=title, description=description, due_date=timezone.now(), created_by='Principal'
+        )
+        TaskAssignment.objects.create(task=task, assignee=assignee, department=assignee.department)
+        return task
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.faculty)
+
+    def search(self, query):
+        response = self.client.get('/api/tasks/search/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['results']
+
+    def test_fts_ranks_title_hits_first(self):
+        if not search_index_exists():
+            self.skipTest('SQLite FTS5 only')
+        results = self.search('audit')
+        self.assertEqual([r['id'] for r in results], [self.title_hit.id, self.description_hit.id])
+        self.assertLess(results[0]['rank'], results[1]['rank'])
+        self.assertEqual(results[0]['title_snippet'], 'Budget <mark>audit</mark>')
+        self.assertIn('<mark>audit</mark>', results[1]['snippet'])
+        # Every term must match, each as a prefix
+        self.assertEqual([r['id'] for r in self.search('aud expen')], [self.description_hit.id])
+
+    def test_icontains_fallback(self):
+        from unittest import mock
+        with mock.patch('task.search.search_index_exists', return_value=False):
+            results = self.search('audit')
+        self.assertEqual([r['id'] for r in results], [self.title_hit.id, self.description_hit.id])
+        self.assertIsNone(results[0]['rank'])
+
+    def test_missing_query(self):
+        response = self.client.get('/api/tasks/search/', {'q': '  '})
+        self.assertEqual(response.status_code, 400)
+
+
+class VisibilityQueryPlanTests(TestCase):
+    """visible_to() filters with indexed EXISTS subqueries instead of join + DISTINCT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hod = User.objects.create_user('hod@example.com', 'pw', role='hod', department='CSE')
+        cls.faculty = User.objects.create_user('faculty@example.com', 'pw', role='faculty', department='CSE')
+        cls.other = User.objects.create_user('other@example.com', 'pw', role='faculty', department='ECE')
+        for assignees in ((cls.faculty, cls.other), (cls.other,)):
+            task = Task.objects.create(
+                title='Task', description='Description', due_date=timezone.now(), created_by='Principal'
+            )
+            for user in assignees:
+                TaskAssignment.objects.create(task=task, assignee=user, department=user.department)
+            TaskHistory.objects.create(task=task, action='created', details={})
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite query plans only')
+
+    def assertIndexedExists(self, queryset):
+        plan = queryset.explain()
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertIn('CORRELATED SCALAR SUBQUERY', plan)
+        self.assertRegex(plan, r'SEARCH U0 USING (COVERING )?INDEX')
+
+    def test_task_visibility(self):
+        for user in (self.hod, self.faculty):
+            with self.subTest(role=user.role):
+                visible = Task.objects.visible_to(user)
+                self.assertEqual(visible.count(), 1)
+                self.assertIndexedExists(visible.for_list())
+
+    def test_history_visibility(self):
+        for user in (self.hod, self.faculty):
+            with self.subTest(role=user.role):
+                visible = TaskHistory.objects.visible_to(user)
+                self.assertEqual(visible.count(), 1)
+                self.assertIndexedExists(visible.select_related('task', 'performed_by')[:10])
+
+    def test_hod_uses_department_index(self):
+        # The composite (department, task) index covers the whole EXISTS probe
+        plan = Task.objects.visible_to(self.hod).explain()
+        self.assertRegex(plan, r'SEARCH U0 USING COVERING INDEX task_assign_departm_\w+ \(department=\? AND task_id=\?\)')
@@ -1,19 +1,33 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     # Common endpoints
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('tasks/', views.get_all_tasks, name='get-all-tasks'),
     path('tasks/<int:task_id>/', views.get_task, name='get-task'),  # Handles GET, PUT, DELETE
+    path('tasks/search/', views.search_tasks, name='search-tasks'),
+    path('tasks/changes/', views.get_task_changes, name='get-task-changes'),
+    path('tasks/events/token/', views.get_events_token, name='get-events-token'),
     path('tasks/create/', views.create_task, name='create-task'),
+    path('tasks/bulk/', views.bulk_create_tasks, name='bulk-create-tasks'),
+    path('tasks/bulk/update/', views.bulk_update_tasks, name='bulk-update-tasks'),
     path('tasks/history/', views.get_task_history, name='get-task-history'),
     path('tasks/<int:task_id>/comments/', views.get_task_comments, name='get-task-comments'),
     path('tasks/comments/', views.get_all_follow_comments, name='get-all-follow-comments'),
+    path('tasks/export/<str:dataset>/', views.export_data, name='export-data'),
     
     # Admin only
     path('tasks/generate-pdf/', views.generate_task_pdf, name='generate-task-pdf'),
     
     # Test email
     path('test-email/', views.test_email, name='test-email'),
+    
+    # Async read endpoints (serve with uvicorn workers)
+    path('async/dashboard/', async_views.dashboard_view, name='async-dashboard'),
+    path('async/tasks/', async_views.get_all_tasks, name='async-get-all-tasks'),
+    path('async/tasks/<int:task_id>/', async_views.get_task, name='async-get-task'),
+    path('async/tasks/history/', async_views.get_task_history, name='async-get-task-history'),
+    path('async/users/', async_views.get_all_users, name='async-get-all-users'),
+    path('async/events/', async_views.task_events, name='async-task-events'),
 ]
\ No newline at end of file
@@ -1,9 +1,8 @@
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
 from datetime import timedelta
-from staff.models import User  # Import User model for HOD lookup
+from .outbox import build_email, enqueue_emails
+from .recipients import admin_emails, resolve_recipients
 def get_task_assignment_html(task, assignee):
     initiated_by = task.created_by.get_full_name() if hasattr(task.created_by, "get_full_name") else str(task.created_by)
     return f"""
@@ -76,70 +75,70 @@ def get_overdue_html(task, assignee):
         <p style="margin-top: 24px;">Sincerely,<br><strong>Task Management System</strong></p>
     </div>
     """
+def get_custom_reminder_html(task, assignee, reminder_type):
+    return f"""
+    <div style="font-family: 'Segoe UI', Arial, sans-serif; padding: 24px; color: #333;">
+        <h2 style="color: #9C27B0;">Task Reminder</h2>
+        <p>Dear {assignee.get_full_name()},</p>
+        <p>This is a scheduled reminder for your task:</p>
+        <div style="border-left: 4px solid #9C27B0; padding-left: 12px; margin: 16px 0;">
+            <p><strong>Title:</strong> {task.title}</p>
+            <p><strong>Description:</strong> {task.description}</p>
+            <p><strong>Due Date:</strong> {task.due_date.strftime('%B %d, %Y, %I:%M %p')}</p>
+            <p><strong>Priority:</strong> {task.priority}</p>
+            <p><strong>Reminder Type:</strong> {reminder_type}</p>
+        </div>
+        <p>Please make sure to complete this task before the due date.</p> 
+        <p style="margin-top: 24px;">Best regards,<br><strong>Task Management System</strong></p>
+    </div>
+    """
+def build_task_assignment_emails(pairs):
+    """Build assignment emails for many (task, assignee) pairs, copying HODs and admins."""
+    recipients = resolve_recipients(pairs, include_admins=True)
+    return [
+        build_email(task.title, get_task_assignment_html(task, assignee), recipient_list)  # ✅ Subject is always the title
+        for (task, assignee), recipient_list in zip(pairs, recipients)
+    ]
+def queue_task_assignment_emails(task, assignees):
+    """Queue assignment emails for many assignees of one task."""
+    return enqueue_emails(build_task_assignment_emails([(task, a) for a in assignees]))
 def send_task_assignment_email(task, assignee):
-    """Send email to assignee and notify HOD/admins."""
+    """Queue email to assignee and notify HOD/admins."""
     try:
-        subject = task.title  # ✅ Subject is always the title
-        html_message = get_task_assignment_html(task, assignee)
-        recipient_list = [assignee.email]
-        # Include HOD
-        if assignee.department:
-            hod = User.objects.filter(department=assignee.department, role='hod').first()
-            if hod and hod.email:
-                recipient_list.append(hod.email)
-        # Include all admins
-        admin_emails = User.objects.filter(
-            Q(role='admin') | Q(is_superuser=True)
-        ).values_list('email', flat=True).distinct()
-        recipient_list.extend(admin_emails)
-        # Remove duplicates / invalids
-        recipient_list = list(set(filter(None, recipient_list)))
-        print(f"Sending email for task '{task.title}' to: {recipient_list}")
-        send_mail(
-            subject=subject,
-            message='',
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            fail_silently=False
-        )
+        queue_task_assignment_emails(task, [assignee])
     except Exception as e:
         if settings.DEBUG:
-            print(f"Error sending task assignment email: {str(e)}")
+            print(f"Error queueing task assignment email: {str(e)}")
 def send_deadline_reminder_email(task, assignee):
-    """Send deadline reminder email."""
+    """Queue deadline reminder email."""
     try:
         subject = task.title  # ✅ Only title
         time_left = task.due_date - timezone.now()
         hours_left = int(time_left.total_seconds() / 3600)
         html_message = get_deadline_reminder_html(task, assignee, hours_left)
-        send_mail(
-            subject=subject,
-            message='',
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[assignee.email],
-            fail_silently=True
-        )
+        enqueue_emails([build_email(subject, html_message, [assignee.email])])
+    except Exception as e:
+        if settings.DEBUG:
+            print(f"Error queueing deadline reminder email: {str(e)}")
+def send_custom_reminder_email(task, assignee, reminder_type):
+    """Queue custom reminder email for reminder1 or reminder2."""
+    try:
+        html_message = get_custom_reminder_html(task, assignee, reminder_type)
+        enqueue_emails([build_email(f"Reminder: {task.title}", html_message, [assignee.email])])
+        return True
     except Exception as e:
         if settings.DEBUG:
-            print(f"Error sending deadline reminder email: {str(e)}")
+            print(f"Error queueing {reminder_type} email: {str(e)}")
+        return False
 def send_overdue_notification(task, assignee):
-    """Send overdue notification email."""
+    """Queue overdue notification email."""
     try:
         subject = task.title  # ✅ Only title
         html_message = get_overdue_html(task, assignee)
-        send_mail(
-            subject=subject,
-            message='',
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[assignee.email],
-            fail_silently=True
-        )
+        enqueue_emails([build_email(subject, html_message, [assignee.email])])
     except Exception as e:
         if settings.DEBUG:
-            print(f"Error sending overdue notification email: {str(e)}")
+            print(f"Error queueing overdue notification email: {str(e)}")
 
 def get_status_update_html(task, assignee, old_status, new_status):
     """Generate HTML for status update email."""
@@ -177,39 +176,82 @@ def get_status_update_html(task, assignee, old_status, new_status):
     </div>
     """
 
+def build_status_update_emails(pairs, old_status, new_status):
+    """Build outbox rows for a status update for many (task, assignee) pairs."""
+    # Always include admin for completed or overdue status
+    recipients = resolve_recipients(pairs, include_admins=new_status in ['completed', 'overdue'])
+    return [
+        build_email(
+            f"Status Update: {task.title}",
+            get_status_update_html(task, assignee, old_status, new_status),
+            recipient_list
+        )
+        for (task, assignee), recipient_list in zip(pairs, recipients)
+    ]
+
 def send_status_update_email(task, assignee, old_status, new_status):
-    """Send email about task status updates."""
+    """Queue email about task status updates."""
     try:
-        subject = f"Status Update: {task.title}"
-        html_message = get_status_update_html(task, assignee, old_status, new_status)
-        recipient_list = [assignee.email]
-        
-        # Include HOD for important status changes
-        if assignee.department:
-            hod = User.objects.filter(department=assignee.department, role='hod').first()
-            if hod and hod.email:
-                recipient_list.append(hod.email)
-        
-        # Always include admin for completed or overdue status
-        if new_status in ['completed', 'overdue']:
-            admin_emails = User.objects.filter(
-                Q(role='admin') | Q(is_superuser=True)
-            ).values_list('email', flat=True).distinct()
-            recipient_list.extend(admin_emails)
-        
-        # Remove duplicates / invalids
-        recipient_list = list(set(filter(None, recipient_list)))
-        
-        send_mail(
-            subject=subject,
-            message='',
-            html_message=html_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            fail_silently=True
-        )
+        enqueue_emails(build_status_update_emails([(task, assignee)], old_status, new_status))
         return True
     except Exception as e:
         if settings.DEBUG:
-            print(f"Error sending status update email: {str(e)}")
-        return False
\ No newline at end of file
+            print(f"Error queueing status update email: {str(e)}")
+        return False
+
+def get_update_digest_html(updates):
+    """Generate HTML for one digest email covering many task updates."""
+    def format_value(field, value):
+        if value is None:
+            return '-'
+        if field == 'due_date':
+            return value.strftime('%B %d, %Y, %I:%M %p')
+        return str(value).replace('_', ' ').title()
+    
+    rows = "".join(
+        f"""
+            <tr>
+                <td style="padding: 6px 12px; border-bottom: 1px solid #eee;">{task.title}</td>
+                <td style="padding: 6px 12px; border-bottom: 1px solid #eee;">{"<br>".join(
+                    f"{field.replace('_', ' ').title()}: {format_value(field, change['old'])} &rarr; <strong>{format_value(field, change['new'])}</strong>"
+                    for field, change in changes.items()
+                )}</td>
+            </tr>"""
+        for task, changes in updates
+    )
+    return f"""
+    <div style="font-family: 'Segoe UI', Arial, sans-serif; padding: 24px; color: #333;">
+        <h2 style="color: #17a2b8;">Tasks Updated</h2>
+        <p>The following {len(updates)} task(s) have been updated.</p>
+        <table style="border-collapse: collapse; margin: 16px 0;">
+            <tr>
+                <th style="text-align: left; padding: 6px 12px; border-bottom: 2px solid #17a2b8;">Task</th>
+                <th style="text-align: left; padding: 6px 12px; border-bottom: 2px solid #17a2b8;">Changes</th>
+            </tr>{rows}
+        </table>
+        <p>Please review these updates and take any necessary actions.</p>
+        <p style="margin-top: 24px;">Regards,<br><strong>Task Management System</strong></p>
+    </div>
+    """
+
+def build_update_digest_emails(entries):
+    """Build one digest email per recipient for many (task, assignee, changes) entries."""
+    entries = list(entries)
+    admins = admin_emails()
+    by_recipient = {}
+    for (task, assignee, changes), recipient_list in zip(
+        entries, resolve_recipients([(task, assignee) for task, assignee, _changes in entries])
+    ):
+        # Admins hear about the same status changes as with single updates
+        if changes.get('status', {}).get('new') in ['completed', 'overdue']:
+            recipient_list = recipient_list + admins
+        for email in recipient_list:
+            by_recipient.setdefault(email, {})[task.id] = (task, changes)
+    return [
+        build_email(
+            f"{len(updates)} task(s) updated",
+            get_update_digest_html(list(updates.values())),
+            [email]
+        )
+        for email, updates in sorted(by_recipient.items())
+    ]
@@ -2,15 +2,25 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .utils import send_task_assignment_email
+from .utils import queue_task_assignment_emails
 from .test_email import test_email
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from .models import Task, TaskAssignment, TaskHistory
+from .models import Task, TaskAssignment, TaskHistory, TaskComment
 from .serializers import TaskSerializer, TaskDetailSerializer, TaskCreateSerializer, TaskHistorySerializer
 from .permissions import IsAdmin, IsHOD, IsAdminOrStaff, IsFaculty, IsStaff
-from django.http import HttpResponse
+from .filters import filter_tasks, parse_datetime_param
+from .exports import DATASETS, FORMATS as EXPORT_FORMATS, export_rows, gzip_stream
+from .pagination import paginate_keyset, get_page_size
+from .counters import get_comment_count, get_dashboard_counts
+from .conditional import conditional_view, dashboard_etag, task_list_etag
+from .reports import iter_task_report_pdf, report_line
+from . import bulk, changes, events, search
+from .search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from .bulk import MAX_BULK_ITEMS
+from django.http import HttpResponse, StreamingHttpResponse
 import csv
 from io import BytesIO
 from reportlab.pdfgen import canvas
@@ -20,65 +30,58 @@ logger = logging.getLogger(__name__)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_view(dashboard_etag)
 def dashboard_view(request):
     """Dashboard stats for all roles"""
-    user = request.user
-    
-    # Get tasks based on role
-    if user.role == 'admin' or user.is_superuser:
-        tasks = Task.objects.all()
-    elif user.role == 'hod':
-        tasks = Task.objects.filter(
-            assignments__department=user.department
-        ).distinct()
-    else:  # staff (Faculty)
-        # Staff can see all tasks (consistent with get_all_tasks)
-        tasks = Task.objects.all()
-    
-    # Calculate stats based on status (not priority)
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(status='completed').count()
-    ongoing_tasks = tasks.filter(status='pending').count()  # pending = ongoing
+    # Counters come from the shared cache and are recomputed with a single
+    # aggregate query only after a write touched the user's scope
+    counts = get_dashboard_counts(request.user)
     
     return Response({
-        'total_task': total_tasks,
-        'completed_task': completed_tasks,
-        'ongoing_task': ongoing_tasks
+        'total_task': counts['total_task'],
+        'completed_task': counts['completed_task'],
+        'ongoing_task': counts['ongoing_task']
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_view(task_list_etag)
 def get_all_tasks(request):
-    """Get all tasks based on user role"""
+    """Get all tasks based on user role.
+
+    Pass ``page_size`` and/or ``cursor`` to page through the results; the
+    response then carries a ``next_cursor`` for the following page.
+    """
     try:
         user = request.user
         
-        # Query based on role hierarchy
-        if user.role in ['admin', 'staff']:
-            # Admin and Staff can see all tasks
-            tasks = Task.objects.all()
-        elif user.role == 'hod':
-            # HOD can only see department tasks
-            tasks = Task.objects.filter(
-                Q(assignments__department=user.department)
-            ).distinct()
-        elif user.role == 'faculty':
-            # Faculty can only see their assigned tasks
-            tasks = Task.objects.filter(
-                assignments__assignee=user
-            ).distinct()
+        # Admin and Staff see all tasks, HOD their department's and faculty their own
+        tasks = Task.objects.visible_to(user)
+        
+        # Server-side filters (status, priority, due_after, due_before, created_by, department)
+        try:
+            tasks = filter_tasks(tasks, request.GET)
+        except ValueError as e:
+            return Response({'error': 'Invalid filter', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Prefetch related data for performance
-        tasks = tasks.prefetch_related('assignments__assignee')
+        # Overdue status is maintained by the sweep_overdue_tasks command, not here
+        tasks = tasks.for_list()
         
-        # Update overdue tasks
-        for task in tasks:
+        # Keyset pagination on (created_at, id) when the client asks for pages
+        if 'cursor' in request.GET or 'page_size' in request.GET:
             try:
-                task.update_status()
-            except Exception as e:
-                logger.warning(f"Error updating status for task {task.id}: {str(e)}")
-                continue
+                page, next_cursor = paginate_keyset(
+                    tasks,
+                    cursor=request.GET.get('cursor'),
+                    page_size=get_page_size(request.GET.get('page_size'))
+                )
+            except ValueError as e:
+                return Response({'error': 'Invalid pagination', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            
+            serializer = TaskSerializer(page, many=True)
+            return Response({'tasks': serializer.data, 'next_cursor': next_cursor})
         
         serializer = TaskSerializer(tasks, many=True)
         return Response({'tasks': serializer.data})
@@ -92,6 +95,88 @@ def get_all_tasks(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_tasks(request):
+    """Full-text search over the tasks the user can see.
+
+    ``q`` is matched against title and description (every word, as a prefix);
+    results are ranked and carry HTML snippets with ``<mark>`` highlights.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Missing search query', 'detail': 'Pass ?q='}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT)), 1), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        tasks, hits = search.search_tasks(request.user, query, limit)
+        results = []
+        for task, data in zip(tasks, TaskSerializer(tasks, many=True).data):
+            rank, title_snippet, snippet = hits[task.id]
+            results.append(dict(data, rank=rank, title_snippet=title_snippet, snippet=snippet))
+        return Response({'results': results})
+    except Exception as e:
+        logger.error(f"Error in search_tasks: {str(e)}")
+        return Response(
+            {'error': 'Search failed', 'detail': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_task_changes(request):
+    """Tasks, follow-up comments and deletions since ``?since=<token>``.
+
+    Poll with the returned ``next`` token. Call without ``since`` to get a
+    first token; ``reset`` asks the client to reload the full task list.
+    """
+    try:
+        try:
+            delta = changes.collect_changes(request.user, request.GET.get('since'))
+        except ValueError as e:
+            return Response({'error': 'Invalid token', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        follow_comments = [{
+            'id': entry.id,
+            'task_id': entry.task_id,
+            'comment': entry.comment,
+            'performed_by': entry.author.email if entry.author else 'System',
+            'timestamp': entry.timestamp,
+        } for entry in delta['comments'].select_related('author')]
+        
+        return Response({
+            'tasks': TaskSerializer(delta['tasks'].for_list(), many=True).data,
+            'follow_comments': follow_comments,
+            'deleted': delta['deleted'],
+            'next': delta['next'],
+            'reset': delta['reset']
+        })
+    except Exception as e:
+        logger.error(f"Error in get_task_changes: {str(e)}")
+        return Response(
+            {'error': 'Failed to fetch changes', 'detail': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def get_events_token(request):
+    """Short-lived token for ``/api/async/events/?token=``.
+
+    EventSource cannot send an Authorization header, and URLs end up in
+    access logs, so the stream takes this token instead of the access token.
+    """
+    return Response({
+        'token': events.make_stream_token(request.user),
+        'expires_in': int(events.STREAM_TOKEN_MAX_AGE.total_seconds())
+    })
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def get_task(request, task_id):
@@ -99,23 +184,17 @@ def get_task(request, task_id):
     user = request.user
     
     try:
-        task = Task.objects.prefetch_related(
-            'assignments__assignee',                                                                        
-            'history__performed_by',
-            'attachments'
-        ).get(id=task_id)
-        
-        # Check permission - Staff can now view all tasks
-        if user.role == 'hod' and not user.is_superuser:
-            if not task.assignments.filter(department=user.department).exists():
-                return Response(
-                    {'error': 'Permission denied'},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        task = Task.objects.for_detail().get(id=task_id)
+        
+        # Check permission - Staff can now view all tasks; assignments are prefetched
+        if not task.is_visible_to(user):
+            return Response(
+                {'error': 'Permission denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
         
         # Handle GET request
         if request.method == 'GET':
-            task.update_status()
             serializer = TaskDetailSerializer(task)
             return Response(serializer.data)
         
@@ -195,6 +274,10 @@ def get_task(request, task_id):
             
             if 'due_date' in request.data:
                 new_deadline = request.data['due_date']
+                try:
+                    parse_datetime_param('due_date', str(new_deadline))
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
                 if str(task.due_date) != str(new_deadline):
                     changes['due_date'] = {'old': str(task.due_date), 'new': str(new_deadline)}
                     task.due_date = new_deadline
@@ -212,66 +295,60 @@ def get_task(request, task_id):
                 elif task.status != 'completed' and task.completed_at:
                     task.completed_at = None
             
-            # Handle assignee and department updates
-            try:
-                if 'assignee' in request.data:
-                    from staff.models import User
-                    
-                    # Clear existing assignments
-                    task.assignments.all().delete()
+            # Assignees, the task row and its history commit (or roll back) together
+            with transaction.atomic():
+                # Handle assignee and department updates
+                try:
+                    if 'assignee' in request.data:
+                        assignees = request.data['assignee']
                     
-                    # Create new assignments
-                    assignees = request.data['assignee']
+                        logger.info(f"Updating assignees: {assignees}")
                     
-                    logger.info(f"Updating assignees: {assignees}")
-                    
-                    # Each assignee gets assigned once with their own department
-                    for email in assignees:
-                        try:
-                            user_obj = User.objects.get(email=email)
-                            # Use the user's department from their profile
-                            # unique_together constraint allows only one assignment per task-assignee pair
-                            TaskAssignment.objects.create(
-                                task=task,
-                                assignee=user_obj,
-                                department=user_obj.department or 'GENERAL'  # Fallback to GENERAL if no department
-                            )
-                            logger.info(f"Assigned {email} with department {user_obj.department}")
-                        except User.DoesNotExist:
+                        # Only removed assignments are deleted and only new ones created
+                        added, removed, unknown = bulk.sync_task_assignees(task, assignees)
+                        for email in unknown:
                             logger.warning(f"Warning: User with email {email} not found")
-                            continue
-                        except Exception as e:
-                            logger.error(f"Error creating assignment for {email}: {str(e)}")
-                            continue
-            except Exception as e:
-                logger.error(f"Error handling assignees: {str(e)}")
-                return Response({'error': 'Error updating assignees', 'detail': str(e)}, status=500)
+                        if added or removed:
+                            changes['assignees'] = {'added': added, 'removed': removed}
+                except Exception as e:
+                    logger.error(f"Error handling assignees: {str(e)}")
+                    transaction.set_rollback(True)
+                    return Response({'error': 'Error updating assignees', 'detail': str(e)}, status=500)
             
-            # Capture follow_comment and decide if to save
-            follow_comment = request.data.get('follow_comment', '').strip()
-            has_changes = bool(changes)
-            should_save = has_changes or bool(follow_comment)
+                # Capture follow_comment and decide if to save
+                follow_comment = request.data.get('follow_comment', '').strip()
+                has_changes = bool(changes)
+                should_save = has_changes or bool(follow_comment)
             
-            if should_save:
-                task.save()
+                if should_save:
+                    task.save()
                 
-                # Build history details
-                history_details = {
-                    'changes': changes,
-                    'updated_fields': list(changes.keys()) if has_changes else []
-                }
-                if follow_comment:
-                    history_details['follow_comment'] = follow_comment
-                    logger.info(f"Follow comment saved for task {task.id}: {follow_comment}")
+                    # Build history details
+                    history_details = {
+                        'changes': changes,
+                        'updated_fields': list(changes.keys()) if has_changes else []
+                    }
                 
-                # Create history entry
-                TaskHistory.objects.create(
-                    task=task,
-                    action='updated',
-                    performed_by=request.user,
-                    details=history_details
-                )
+                    # Create history entry; the comment goes to its own indexed table
+                    history = TaskHistory.objects.create(
+                        task=task,
+                        action='updated',
+                        performed_by=request.user,
+                        details=history_details,
+                        comment=follow_comment if follow_comment else None
+                    )
+                    if follow_comment:
+                        TaskComment.objects.create(
+                            task=task,
+                            history=history,
+                            author=request.user,
+                            comment=follow_comment,
+                            timestamp=history.timestamp
+                        )
+                        logger.info(f"Follow comment saved for task {task.id}: {follow_comment}")
             
+            # Reload so the prefetched assignments and history reflect this update
+            task = Task.objects.for_detail().get(id=task.id)
             return Response(TaskDetailSerializer(task).data)
         
         # Handle DELETE request
@@ -288,7 +365,7 @@ def get_task(request, task_id):
                 user.role == 'admin' or 
                 user.role == 'staff' or  # Staff (Faculty) can delete all tasks
                 user.is_superuser or
-                (user.role == 'hod' and task.assignments.filter(department=user.department).exists()) or
+                (user.role == 'hod' and task.is_visible_to(user)) or
                 is_creator
             )
             
@@ -330,18 +407,77 @@ def create_task(request):
     )
     serializer.is_valid(raise_exception=True)
     
-    # Create the task with the provided created_by name
-    task = serializer.save()
-    
-    # Send email notifications to assigned staff and their HODs
-    for assignment in task.assignments.all():
-        send_task_assignment_email(task, assignment.assignee)
+    # The task and its outbox emails commit (or roll back) together
+    with transaction.atomic():
+        # Create the task with the provided created_by name
+        task = serializer.save()
+        
+        # Queue email notifications to assigned staff and their HODs
+        queue_task_assignment_emails(task, [a.assignee for a in task.assignments.select_related('assignee')])
     
+    task = Task.objects.for_detail().get(id=task.id)
     return Response(
         TaskDetailSerializer(task).data,
         status=status.HTTP_201_CREATED
     )
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminOrStaff])
+def bulk_create_tasks(request):
+    """Create many tasks in one transaction (Admin/Staff).
+
+    Accepts a JSON array of task objects shaped like the create_task payload.
+    Invalid items are reported per index without aborting the others.
+    """
+    items = request.data
+    if not isinstance(items, list):
+        return Response({'error': 'Expected a list of tasks'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BULK_ITEMS:
+        return Response(
+            {'error': f'At most {MAX_BULK_ITEMS} tasks can be created at once'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    tasks, errors = bulk.bulk_create_tasks(items, request.user)
+    
+    if not tasks:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif errors:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_201_CREATED
+    
+    return Response({
+        'created': [task.id for task in tasks],
+        'errors': errors
+    }, status=response_status)
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated, IsAdminOrStaff])
+def bulk_update_tasks(request):
+    """Apply one change to many tasks (Admin/Staff).
+
+    Body: ``{"ids": [...]}`` or ``{"filter": {...}}`` (task list filters),
+    plus ``{"changes": {"status"|"priority"|"due_date": ...}}``.
+    """
+    try:
+        queryset = bulk.select_tasks(request.data)
+        changes = bulk.parse_bulk_changes(request.data.get('changes'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        updated = bulk.bulk_update_tasks(queryset, changes, request.user)
+        return Response({'updated': updated, 'count': len(updated)})
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error in bulk_update_tasks: {str(e)}")
+        return Response(
+            {'error': 'Error updating tasks', 'detail': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_task(request, task_id):
@@ -427,8 +563,8 @@ def update_task(request, task_id):
                 'updated_fields': list(changes.keys()) if has_changes else []
             }
             
-            # NEW: Save comment to dedicated field
-            TaskHistory.objects.create(
+            # Save comment to dedicated field and the comment table
+            history = TaskHistory.objects.create(
                 task=task,
                 action='updated',
                 performed_by=request.user,
@@ -437,8 +573,16 @@ def update_task(request, task_id):
             )
             
             if follow_comment:
+                TaskComment.objects.create(
+                    task=task,
+                    history=history,
+                    author=request.user,
+                    comment=follow_comment,
+                    timestamp=history.timestamp
+                )
                 logger.info(f"Follow comment saved for task {task.id}: {follow_comment}")
         
+        task = Task.objects.for_detail().get(id=task.id)
         return Response(TaskDetailSerializer(task).data)
         
     except Task.DoesNotExist:
@@ -473,8 +617,21 @@ def delete_task(request, task_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdmin])
 def generate_task_pdf(request):
-    """Generate PDF report of all tasks"""
-    tasks = Task.objects.select_related('created_by').prefetch_related('assignments')
+    """Generate PDF report of all tasks.
+
+    Accepts the task list filters (status, department, due_after, due_before).
+    Pass ``stream=true`` to send pages as they are rendered instead of
+    building the whole document in memory first.
+    """
+    try:
+        tasks = filter_tasks(Task.objects.all(), request.GET)
+    except ValueError as e:
+        return Response({'error': 'Invalid filter', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if request.GET.get('stream', '').lower() in ['1', 'true']:
+        response = StreamingHttpResponse(iter_task_report_pdf(tasks), content_type='application/pdf')
+        response['Content-Disposition'] = 'attachment; filename="tasks_report.pdf"'
+        return response
     
     # Create PDF
     buffer = BytesIO()
@@ -484,12 +641,12 @@ def generate_task_pdf(request):
     p.drawString(100, y, "Task Management Report")
     y -= 30
     
-    for task in tasks:
+    for title, priority in tasks.values_list('title', 'priority'):
         if y < 100:
             p.showPage()
             y = 800
         
-        p.drawString(100, y, f"{task.title} - {task.priority}")
+        p.drawString(100, y, report_line(title, priority))
         y -= 20
     
     p.save()
@@ -500,6 +657,49 @@ def generate_task_pdf(request):
     return response
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_data(request, dataset):
+    """Stream tasks, assignments or history as CSV or NDJSON.
+
+    Query parameters: ``output`` (csv or ndjson), ``since`` (ISO datetime; only
+    rows changed after it) and ``gzip`` (true to compress on the fly).
+    """
+    if dataset not in DATASETS:
+        return Response(
+            {'error': f"Unknown dataset '{dataset}'", 'datasets': sorted(DATASETS)},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    output = request.GET.get('output', 'csv').lower()
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Unknown output '{output}'", 'outputs': sorted(EXPORT_FORMATS)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_datetime_param('since', request.GET['since'])
+        except ValueError as e:
+            return Response({'error': 'Invalid since', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    columns, rows = export_rows(dataset, request.user, since=since)
+    render, content_type = EXPORT_FORMATS[output]
+    chunks = render(columns, rows)
+    filename = f"{dataset}.{output}"
+    
+    if request.GET.get('gzip', '').lower() in ['1', 'true']:
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type=f'{content_type}; charset=utf-8')
+    
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_task_history(request):
@@ -507,58 +707,30 @@ def get_task_history(request):
     from .serializers import TaskHistorySerializer
     user = request.user
     
-    # Get history based on role
-    if user.role == 'admin' or user.is_superuser:
-        # Admin sees all history
-        history = TaskHistory.objects.select_related(
-            'task', 'performed_by'
-        ).all()[:10]
-        
-        # For admin, get all follow-up comments, not just from recent history
-        comment_history = TaskHistory.objects.filter(
-            action='updated',
-            details__follow_comment__isnull=False
-        ).select_related('task', 'performed_by').order_by('-timestamp')[:20]
-    elif user.role == 'hod':
-        # HOD sees history for tasks in their department
-        history = TaskHistory.objects.select_related(
-            'task', 'performed_by'
-        ).filter(
-            task__assignments__department=user.department
-        ).distinct()[:10]
-        
-        # HODs do not see follow-up comments as per updated requirements
-        comment_history = TaskHistory.objects.none()
-    else:  # staff
-        # Staff sees all task history
-        history = TaskHistory.objects.select_related(
-            'task', 'performed_by'
-        ).all()[:10]
-        
-        # Staff sees all comments
-        comment_history = TaskHistory.objects.filter(
-            action='updated',
-            details__follow_comment__isnull=False
-        ).select_related('task', 'performed_by').order_by('-timestamp')[:20]
+    # Admin and Staff see all history, HOD their department's and faculty their own tasks'
+    history = TaskHistory.objects.visible_to(user).select_related(
+        'task', 'performed_by'
+    )[:10]
     
-    # Extract follow-up comments
-    comments = []
-    for entry in comment_history:
-        if 'follow_comment' in entry.details:
-            comments.append({
-                'id': entry.id,
-                'task_id': entry.task.id,
-                'comment': entry.details['follow_comment'],
-                'performed_by': entry.performed_by.email if entry.performed_by else 'System',
-                'timestamp': entry.timestamp,
-                'full_details': entry.details,  # Optional: Full history for context
-            })
+    # Latest follow-up comments the user may see (none for HODs), read
+    # newest-first from the timestamp index
+    comments = TaskComment.objects.visible_to(user).select_related(
+        'author', 'history'
+    ).order_by('-timestamp')[:20]
+    follow_comments = [{
+        'id': entry.id,
+        'task_id': entry.task_id,
+        'comment': entry.comment,
+        'performed_by': entry.author.email if entry.author else 'System',
+        'timestamp': entry.timestamp,
+        'full_details': entry.history.details if entry.history else {},  # Optional: Full history for context
+    } for entry in comments]
     
     # Serialize full history
     serializer = TaskHistorySerializer(history, many=True)
     return Response({
         'activities': serializer.data,
-        'follow_comments': comments  # Dedicated list of comments from broader query
+        'follow_comments': follow_comments  # Dedicated list of comments from broader query
     })
 
 @api_view(['GET'])
@@ -571,20 +743,16 @@ def get_task_comments(request, task_id):
         if request.user.role == 'hod':
             return Response({'error': 'HODs do not have access to follow-up comments'}, status=status.HTTP_403_FORBIDDEN)
         
-        # Fetch history entries with follow_comments
-        history = TaskHistory.objects.filter(
-            task_id=task_id,
-            action='updated',
-            details__follow_comment__isnull=False
-        ).select_related('performed_by').order_by('-timestamp')
+        # Served by the (task, -timestamp) index on task_comments
+        comments = TaskComment.objects.filter(task_id=task_id).select_related('author').order_by('-timestamp')
         
         follow_comments = [{
             'id': entry.id,
             'task_id': task_id,
-            'comment': entry.details['follow_comment'],
-            'performed_by': entry.performed_by.email if entry.performed_by else 'System',
+            'comment': entry.comment,
+            'performed_by': entry.author.email if entry.author else 'System',
             'timestamp': entry.timestamp,
-        } for entry in history]
+        } for entry in comments]
         
         return Response({'follow_comments': follow_comments})
     except Task.DoesNotExist:
@@ -599,62 +767,55 @@ def get_task_comments(request, task_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_follow_comments(request):
-    """Get all follow-up comments across tasks with pagination"""
+    """Get all follow-up comments across tasks, one keyset page at a time"""
+    # Offset pages were replaced by cursors; fail loudly rather than repeat page 1
+    if 'page' in request.GET:
+        return Response(
+            {
+                'error': 'The page parameter is no longer supported',
+                'detail': 'Follow the next_cursor of each response with ?cursor=<next_cursor>'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     try:
-        # Get pagination parameters
-        page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 20))
-        
-        # Calculate offset
-        offset = (page - 1) * page_size
-        limit = offset + page_size
-        
         user = request.user
         
-        # Filter based on role
-        if user.role == 'admin' or user.is_superuser:
-            # Admin sees all follow comments
-            query = TaskHistory.objects.filter(
-                action='updated',
-                details__follow_comment__isnull=False
+        # Admin sees all comments, HODs none and everyone else those on their tasks;
+        # the assignment check is an EXISTS, so no join + DISTINCT
+        query = TaskComment.objects.visible_to(user)
+        
+        # Keyset pagination on (timestamp, id): deep pages cost the same as the first
+        try:
+            page_size = get_page_size(request.GET.get('page_size'), default=20)
+            entries, next_cursor = paginate_keyset(
+                query.select_related('task', 'author'),
+                cursor=request.GET.get('cursor'),
+                page_size=page_size,
+                timestamp_field='timestamp'
             )
-        elif user.role == 'hod':
-            # HODs do not see follow-up comments as per updated requirements
-            query = TaskHistory.objects.none()
-        else:
-            # Staff sees all comments assigned to them
-            query = TaskHistory.objects.filter(
-                action='updated',
-                details__follow_comment__isnull=False,
-                task__assignments__assignee=user
-            ).distinct()
-            
-        # Execute query with pagination
-        total_count = query.count()
-        history_entries = query.select_related('task', 'performed_by').order_by('-timestamp')[offset:limit]
+        except ValueError as e:
+            return Response({'error': 'Invalid pagination', 'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Format comments
-        follow_comments = []
-        for entry in history_entries:
-            if 'follow_comment' in entry.details:
-                follow_comments.append({
-                    'id': entry.id,
-                    'task_id': entry.task.id,
-                    'task_title': entry.task.title,  # Include task title for context
-                    'comment': entry.details['follow_comment'],
-                    'performed_by': entry.performed_by.email if entry.performed_by else 'System',
-                    'timestamp': entry.timestamp,
-                })
-        
-        # Return paginated response
+        follow_comments = [{
+            'id': entry.id,
+            'task_id': entry.task_id,
+            'task_title': entry.task.title,  # Include task title for context
+            'comment': entry.comment,
+            'performed_by': entry.author.email if entry.author else 'System',
+            'timestamp': entry.timestamp,
+        } for entry in entries]
+        
+        pagination = {'page_size': page_size, 'next_cursor': next_cursor}
+        # Counting the whole feed is opt-in and served from a short-lived cache
+        if request.GET.get('include_total', '').lower() == 'true':
+            pagination['total'] = get_comment_count(user, query)
+        
         return Response({
             'follow_comments': follow_comments,
-            'pagination': {
-                'total': total_count,
-                'page': page,
-                'page_size': page_size,
-                'pages': (total_count + page_size - 1) // page_size  # Ceiling division
-            }
+            'next_cursor': next_cursor,
+            'pagination': pagination
         })
         
     except Exception as e: